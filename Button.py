@@ -3,15 +3,56 @@ import sys
 import random
 import time
 import math
+from collections import OrderedDict
+
 import constants as c
+from input_source import Input
+
+
+class GlyphAtlas:
+    """
+    Every character of a font rendered in one color, side by side on a single surface.
+    """
+
+    def __init__(self, font, color, chars):
+        glyphs = {char: font.render(char, 1, color) for char in chars}
+        width = sum(glyph.get_width() for glyph in glyphs.values())
+        height = max(glyph.get_height() for glyph in glyphs.values())
+        self.surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.areas = {}
+        x = 0
+        for char, glyph in glyphs.items():
+            # MAX copies the glyph's pixels and alpha as they are, rather than blending them onto nothing
+            self.areas[char] = self.surface.blit(glyph, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            x += glyph.get_width()
+
+    def layout(self, text):
+        """
+        :return: (width, height, glyphs) of the text, where each glyph is (atlas, x offset, area).
+            Glyphs vary in height, so the text is as tall as its first character.
+        """
+        glyphs = []
+        x = 0
+        for char in text:
+            area = self.areas[char]
+            glyphs.append((self.surface, x, area))
+            x += area.width
+        return x, self.areas[text[0]].height, glyphs
 
 
 class Button:
 
     FONT = None
-    FONT_CACHE = None
-    FONT_CACHE_DISABLED = None
-    FONT_CACHE_HOVER = None
+    # A GlyphAtlas for each state text is drawn in
+    ATLASES = None
+    # (text, state): (width, height, glyphs), laid out once and shared by every button
+    LAYOUTS = {}
+
+    # Scales are rounded to this before scaling, so an animation reuses the same few surfaces
+    SCALE_STEP = 0.01
+    # (surface, width, height): scaled surface, shared by every button
+    SCALED_SURFS = OrderedDict()
+    SCALED_CACHE_SIZE = 256
 
     def __init__(self,
                  surf,
@@ -26,7 +67,7 @@ class Button:
                  pulse=True,
                  on_click_args=None):
 
-        self.x, self.y = pos
+        self._x, self._y = pos
         self.width, self.height = surf.get_width(), surf.get_height()
         self.text = text
         self.surf = surf
@@ -44,15 +85,56 @@ class Button:
             on_click_args=()
         self.on_click_args = on_click_args
 
+        # Where the text was last drawn, and the blits that drew it
+        self.text_key = None
+        self.text_blits = None
+        # The ButtonGroup this is in, which works out hovering for every button in it at once
+        self.group = None
+        self.bounds = None
+        self.update_bounds()
+
         if text and not Button.FONT:
             Button.pre_init()
 
     @staticmethod
     def pre_init():
+        # With c.LAZY_INIT the font module may not be started yet
+        pygame.font.init()
         Button.FONT = pygame.font.Font("assets/fonts/Rudiment.ttf", 35)
-        Button.FONT_CACHE = {char: Button.FONT.render(char, 1, c.WHITE) for char in c.CHARS}
-        Button.FONT_CACHE_DISABLED = {char: Button.FONT.render(char, 1, (50, 50, 50)) for char in c.CHARS}
-        Button.FONT_CACHE_HOVER = {char: Button.FONT.render(char, 1, c.YELLOW) for char in c.CHARS}
+        Button.ATLASES = {
+            "normal": GlyphAtlas(Button.FONT, c.WHITE, c.CHARS),
+            "disabled": GlyphAtlas(Button.FONT, (50, 50, 50), c.CHARS),
+            "hover": GlyphAtlas(Button.FONT, c.YELLOW, c.CHARS),
+        }
+
+    @staticmethod
+    def layout(text, state):
+        """
+        :param state: Which of Button.ATLASES to draw with
+        :return: (width, height, glyphs) of the text, where each glyph is (atlas, x offset, area)
+        """
+        key = text, state
+        if key not in Button.LAYOUTS:
+            Button.LAYOUTS[key] = Button.ATLASES[state].layout(text)
+        return Button.LAYOUTS[key]
+
+    @staticmethod
+    def scaled(surf, scale):
+        """
+        Gets a surface scaled to the nearest SCALE_STEP, from cache if it's been scaled that much before.
+        :return: The scaled surface. This is shared, so don't be destructive.
+        """
+        scale = round(scale / Button.SCALE_STEP) * Button.SCALE_STEP
+        key = surf, int(surf.get_width() * scale), int(surf.get_height() * scale)
+        cache = Button.SCALED_SURFS
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        scaled = pygame.transform.scale(surf, key[1:])
+        cache[key] = scaled
+        if len(cache) > Button.SCALED_CACHE_SIZE:
+            cache.popitem(last=False)
+        return scaled
 
     def click(self):
         if not self.enabled:
@@ -73,16 +155,51 @@ class Button:
     def toggle(self):
         self.enabled = not self.enabled
 
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, x):
+        self._x = x
+        self.update_bounds()
+
+    @property
+    def y(self):
+        return self._y
+
+    @y.setter
+    def y(self, y):
+        self._y = y
+        self.update_bounds()
+
+    def move_to(self, pos):
+        self._x, self._y = pos
+        self.update_bounds()
+
+    def update_bounds(self):
+        """
+        Works out the hit box again, after the button moves. It's the size of the unscaled surface.
+        """
+        if self.group is not None:
+            self.group.unindex(self)
+        self.bounds = (self.x - self.width/2, self.y - self.height/2,
+                       self.x + self.width/2, self.y + self.height/2)
+        if self.group is not None:
+            self.group.index(self)
+
+    def contains(self, position):
+        """
+        :param position: A point on the small screen
+        """
+        min_x, min_y, max_x, max_y = self.bounds
+        return min_x < position[0] < max_x and min_y < position[1] < max_y
+
     def is_hovered(self):
-        mpos = pygame.mouse.get_pos()
-        mpos = mpos[0] / c.WINDOW_SCALE, mpos[1] / c.WINDOW_SCALE
-        min_x = self.x - self.width/2
-        max_x = self.x + self.width/2
-        min_y = self.y - self.height/2
-        max_y = self.y + self.height/2
-        if min_x < mpos[0] < max_x and min_y < mpos[1] < max_y:
-            return True
-        return False
+        if self.group is not None:
+            return self.group.hovered is self
+        mpos = Input.mouse_position()
+        return self.contains((mpos[0] / c.WINDOW_SCALE, mpos[1] / c.WINDOW_SCALE))
 
     def get_surf(self):
         surf = None
@@ -95,9 +212,7 @@ class Button:
         else:
             surf = self.surf
         if self.scale != 1.0:
-            width = int(surf.get_width() * self.scale)
-            height = int(surf.get_height() * self.scale)
-            surf = pygame.transform.scale(surf, (width, height))
+            surf = Button.scaled(surf, self.scale)
         return surf
 
     def draw(self, surface, xoff=0, yoff=0):
@@ -109,36 +224,51 @@ class Button:
         if not self.text:
             return
         if not self.enabled:
-            font_cache = self.FONT_CACHE_DISABLED
+            state = "disabled"
         elif self.is_hovered():
-            font_cache = self.FONT_CACHE_HOVER
+            state = "hover"
         else:
-            font_cache = self.FONT_CACHE
-        chars = [font_cache[letter] for letter in self.text]
-        width = sum([char.get_width() for char in chars])
-        x = self.x - width//2 + xoff
-        y = self.y - chars[0].get_height()//2 + yoff
-        for char in chars:
-            surface.blit(char, (x, y))
-            x += char.get_width()
-
-
-
-    def update(self, dt, events):
-        for event in events:
-            if event.type == pygame.MOUSEBUTTONUP:
-                if event.button == 1:
-                    if self.clicked and self.is_hovered():
-                        self.click()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1:
-                    if self.is_hovered():
-                        self.clicked = True
+            state = "normal"
+        # The blits only change when the button moves or changes state
+        key = self.text, state, self.x + xoff, self.y + yoff
+        if key != self.text_key:
+            width, height, glyphs = Button.layout(self.text, state)
+            x = self.x - width//2 + xoff
+            y = self.y - height//2 + yoff
+            self.text_blits = [(atlas, (x + glyph_x, y), area) for atlas, glyph_x, area in glyphs]
+            self.text_key = key
+        surface.blits(self.text_blits, doreturn=False)
+
+
+
+    def subscribe(self, bus):
+        """
+        Subscribes to the mouse buttons. A button in a ButtonGroup is left to its group's subscription.
+        :param bus: Game's EventBus
+        """
+        bus.subscribe(pygame.MOUSEBUTTONDOWN, self.handle_event, owner=self)
+        bus.subscribe(pygame.MOUSEBUTTONUP, self.handle_event, owner=self)
+
+    def update(self, dt):
+        self.animate(dt)
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONUP:
+            if event.button == 1:
+                if self.clicked and self.is_hovered():
+                    self.click()
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if event.button == 1:
+                if self.is_hovered():
+                    self.clicked = True
+
+    def animate(self, dt):
+        hovered = self.is_hovered()
         if self.clicked:
-            if not self.is_hovered():
+            if not hovered:
                 self.clicked = False
 
-        if self.is_hovered() and self.enabled:
+        if hovered and self.enabled:
             self.target_scale = 1.0 + self.grow_percent/100
         elif self.pulse and self.enabled:
             self.target_scale = 1.0
@@ -156,6 +286,106 @@ class Button:
         elif ds > 0:
             self.scale = min(self.scale + ds * dt * 20, self.target_scale)
 
+class ButtonGroup:
+    """
+    Updates and draws a set of buttons together. The pointer is read once per update, and only
+    the buttons in the same cell of a spatial hash are tested against it, so finding the hovered
+    button takes the same time however many there are. Mouse events only go to that button.
+    """
+
+    # Size of a spatial hash cell on the small screen
+    CELL_SIZE = 32
+
+    def __init__(self, buttons=()):
+        self.buttons = []
+        # (column, row): buttons overlapping that cell, in the order they were added
+        self.cells = {}
+        self.hovered = None
+        self.pointer = (0, 0)
+        # Buttons that are hovered, clicked or not at their resting scale. The rest have nothing to animate.
+        self.active = set()
+        for button in buttons:
+            self.add(button)
+
+    def add(self, button):
+        button.group = self
+        self.buttons.append(button)
+        self.index(button)
+
+    def remove(self, button):
+        self.buttons.remove(button)
+        self.unindex(button)
+        self.active.discard(button)
+        button.group = None
+        if self.hovered is button:
+            self.hovered = None
+
+    @staticmethod
+    def cells_under(bounds):
+        min_x, min_y, max_x, max_y = bounds
+        size = ButtonGroup.CELL_SIZE
+        return [(column, row)
+                for column in range(int(min_x // size), int(max_x // size) + 1)
+                for row in range(int(min_y // size), int(max_y // size) + 1)]
+
+    def index(self, button):
+        for cell in ButtonGroup.cells_under(button.bounds):
+            self.cells.setdefault(cell, []).append(button)
+
+    def unindex(self, button):
+        """
+        Takes a button out of the spatial hash. Call this before its bounds change.
+        """
+        for cell in ButtonGroup.cells_under(button.bounds):
+            self.cells[cell].remove(button)
+            if not self.cells[cell]:
+                del self.cells[cell]
+
+    def button_at(self, position):
+        """
+        :param position: A point on the small screen
+        :return: The button there, or None. Where buttons overlap, the last one added wins.
+        """
+        size = ButtonGroup.CELL_SIZE
+        cell = int(position[0] // size), int(position[1] // size)
+        for button in reversed(self.cells.get(cell, ())):
+            if button.contains(position):
+                return button
+        return None
+
+    def subscribe(self, bus):
+        """
+        Subscribes to the mouse buttons once for every button in the group.
+        :param bus: Game's EventBus
+        """
+        bus.subscribe(pygame.MOUSEBUTTONDOWN, self.handle_event, owner=self)
+        bus.subscribe(pygame.MOUSEBUTTONUP, self.handle_event, owner=self)
+
+    def handle_event(self, event):
+        # Events are handled before update, so find the hovered button first
+        self.find_hovered()
+        if self.hovered is not None:
+            self.hovered.handle_event(event)
+
+    def find_hovered(self):
+        mpos = Input.mouse_position()
+        self.pointer = mpos[0] / c.WINDOW_SCALE, mpos[1] / c.WINDOW_SCALE
+        self.hovered = self.button_at(self.pointer)
+        if self.hovered is not None:
+            self.active.add(self.hovered)
+
+    def update(self, dt):
+        self.find_hovered()
+        for button in list(self.active):
+            button.animate(dt)
+            if button is not self.hovered and not button.clicked and button.scale == 1.0:
+                self.active.discard(button)
+
+    def draw(self, surface, xoff=0, yoff=0):
+        for button in self.buttons:
+            button.draw(surface, xoff, yoff)
+
+
 if __name__ == '__main__':
 
     class Color:
@@ -167,6 +397,8 @@ if __name__ == '__main__':
                         random.random()*255,
                         random.random()*255)
 
+    from main import EventBus
+
     screen = pygame.display.set_mode((800, 600))
     then = time.time()
 
@@ -183,17 +415,22 @@ if __name__ == '__main__':
                     click_surf=button_clicked,
                     disabled_surf=button_disabled)
 
+    def quit(event):
+        pygame.quit()
+        sys.exit()
+
+    bus = EventBus()
+    bus.subscribe(pygame.QUIT, quit)
+    button.subscribe(bus)
+
     while True:
         now = time.time()
         dt = now - then
         then = now
-        events = pygame.event.get()
-        for event in events:
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+        bus.pump()
+        bus.dispatch()
 
-        button.update(dt, events)
+        button.update(dt)
 
         screen.fill(color.val)
         button.draw(screen)
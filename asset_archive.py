@@ -0,0 +1,198 @@
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+
+import pygame
+
+
+class AssetArchive:
+    """
+    Static class that reads assets out of a single packed archive instead of many small files.
+    Images are stored as raw RGBA pixels and sounds as raw PCM, so nothing needs decoding.
+    Only the assets the game preloads are packed. Build the archive with: python asset_archive.py
+
+    The layout is MAGIC, the length of the JSON index as a little endian uint32, the index,
+    then each asset's data, aligned to ALIGNMENT bytes from the start of the file. The index
+    records each source file's size and modification time, and anything that has changed since
+    the archive was built is left out of it, so the loose file is loaded instead.
+    """
+
+    # Changes whenever the layout does. An archive with any other one is ignored.
+    MAGIC = b"LD58PAK3"
+    ALIGNMENT = 16
+    IMAGE_EXTENSIONS = (".png",)
+
+    initialized = False
+    data = None
+    index = None
+    mixer_format = None
+
+    @staticmethod
+    def init(archive_path):
+        """
+        Opens the archive if it's been built. Without one, every lookup misses and the managers
+        load the loose files as usual.
+        :param archive_path: Path of the archive
+        """
+        AssetArchive.initialized = False
+        if not os.path.exists(archive_path):
+            return
+        with open(archive_path, "rb") as file:
+            if AssetArchive.is_web_build():
+                # mmap isn't dependable in the browser, and the file is already in memory there
+                AssetArchive.data = memoryview(file.read())
+            else:
+                AssetArchive.data = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+        data = AssetArchive.data
+        if bytes(data[:len(AssetArchive.MAGIC)]) != AssetArchive.MAGIC:
+            # Built by another version of the game, so load the loose files until it's built again
+            AssetArchive.data = None
+            return
+        header_size = len(AssetArchive.MAGIC) + 4
+        index_size, = struct.unpack("<I", data[len(AssetArchive.MAGIC):header_size])
+        header = json.loads(bytes(data[header_size:header_size + index_size]))
+        AssetArchive.index = {path: entry for path, entry in header["assets"].items()
+                              if not AssetArchive.is_stale(path, entry)}
+        AssetArchive.mixer_format = tuple(header["mixer"]) if header["mixer"] else None
+        AssetArchive.initialized = True
+
+    @staticmethod
+    def is_web_build():
+        return sys.platform == "emscripten"
+
+    @staticmethod
+    def is_stale(path, entry):
+        """
+        :return: Whether the loose file has changed since it was packed
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            # The archive is the only copy
+            return False
+        return stat.st_size != entry["source_size"] or stat.st_mtime_ns != entry["mtime"]
+
+    @staticmethod
+    def view(path):
+        """
+        :return: A memoryview of the stored bytes, without copying them, and the asset's entry
+        """
+        if not AssetArchive.initialized or path not in AssetArchive.index:
+            return None, None
+        entry = AssetArchive.index[path]
+        offset = entry["offset"]
+        return AssetArchive.data[offset:offset + entry["size"]], entry
+
+    @staticmethod
+    def image(path):
+        """
+        :return: An unconverted surface that shares memory with the archive, or None if it isn't in it
+        """
+        data, entry = AssetArchive.view(path)
+        if data is None or entry["kind"] != "image":
+            return None
+        return pygame.image.frombuffer(data, tuple(entry["size_px"]), "RGBA")
+
+    @staticmethod
+    def sound(path):
+        """
+        :return: A sound made from the stored PCM, or None if it isn't in the archive or
+            was packed for a different mixer format
+        """
+        data, entry = AssetArchive.view(path)
+        if data is None or entry["kind"] != "sound":
+            return None
+        if pygame.mixer.get_init() != AssetArchive.mixer_format:
+            return None
+        return pygame.mixer.Sound(buffer=data)
+
+    @staticmethod
+    def load(path):
+        """
+        :return: The image or sound at path, or None if it isn't in the archive
+        """
+        if path.endswith(AssetArchive.IMAGE_EXTENSIONS):
+            return AssetArchive.image(path)
+        return AssetArchive.sound(path)
+
+    @staticmethod
+    def file(path):
+        """
+        For files that are streamed rather than decoded up front, like music.
+        :return: A file object over the stored bytes, or None if it isn't in the archive
+        """
+        data, entry = AssetArchive.view(path)
+        if data is None or entry["kind"] != "file":
+            return None
+        return io.BytesIO(data)
+
+    @staticmethod
+    def build(archive_path, paths, streamed=()):
+        """
+        Packs assets into one archive.
+        :param archive_path: Where to write the archive
+        :param paths: The images and sounds the game preloads
+        :param streamed: Paths to store as their original file bytes instead of decoding, like music
+        """
+        assets = {}
+        blobs = []
+        mixer_format = None
+        for path in dict.fromkeys(list(paths) + list(streamed)):
+            if path in streamed:
+                with open(path, "rb") as file:
+                    blob = file.read()
+                entry = {"kind": "file"}
+            elif path.endswith(AssetArchive.IMAGE_EXTENSIONS):
+                surface = pygame.image.load(path)
+                blob = pygame.image.tobytes(surface, "RGBA")
+                entry = {"kind": "image", "size_px": surface.get_size()}
+            else:
+                if not pygame.mixer.get_init():
+                    pygame.mixer.init()
+                mixer_format = pygame.mixer.get_init()
+                blob = pygame.mixer.Sound(path).get_raw()
+                entry = {"kind": "sound"}
+            stat = os.stat(path)
+            entry.update(size=len(blob), source_size=stat.st_size, mtime=stat.st_mtime_ns)
+            assets[path] = entry
+            blobs.append((entry, blob))
+
+        # Offsets depend on the index's length, so lay out the data until the index stops growing
+        index_size = 0
+        while True:
+            offset = len(AssetArchive.MAGIC) + 4 + index_size
+            for entry, blob in blobs:
+                offset += -offset % AssetArchive.ALIGNMENT
+                entry["offset"] = offset
+                offset += len(blob)
+            index = json.dumps({"mixer": mixer_format, "assets": assets}).encode()
+            if len(index) <= index_size:
+                break
+            index_size = len(index)
+        index = index.ljust(index_size)
+
+        with open(archive_path, "wb") as file:
+            file.write(AssetArchive.MAGIC)
+            file.write(struct.pack("<I", index_size))
+            file.write(index)
+            for entry, blob in blobs:
+                file.write(b"\0" * (entry["offset"] - file.tell()))
+                file.write(blob)
+
+
+if __name__ == "__main__":
+    # Sounds are stored in whatever format the mixer opens with, so build with the game's audio settings
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    import constants as c
+    from asset_loader import AssetLoader
+    from level_library import LevelLibrary
+
+    pygame.init()
+    archive_path = sys.argv[1] if len(sys.argv) > 1 else c.ASSET_ARCHIVE
+    paths = list(dict.fromkeys(AssetLoader.manifest_paths(c.ASSET_MANIFEST) + LevelLibrary.asset_paths()))
+    AssetArchive.build(archive_path, paths, streamed=c.STREAMED_ASSETS)
+    print(f"Packed {archive_path} ({os.path.getsize(archive_path)} bytes)")
@@ -0,0 +1,203 @@
+import asyncio
+import heapq
+import json
+import sys
+import threading
+
+import pygame
+
+from asset_archive import AssetArchive
+
+
+class AssetLoader:
+    """
+    Static class that decodes assets in the background, most urgent first, so the managers
+    usually find them ready. Runs on a worker thread, or as an asyncio task in the web build
+    where there are no threads.
+
+    Decoded images aren't converted to the display format here, since that has to happen on
+    the main thread. ImageManager does that when it takes them.
+    """
+
+    # Lower goes first
+    NOW = 0
+    SOON = 1
+    LATER = 2
+
+    initialized = False
+    condition = None
+    queue = None
+    priorities = None
+    in_progress = None
+    decoded = None
+    taken = None
+    sequence = 0
+    thread = None
+    task = None
+    # Set when something's queued, so the web build's task can sleep while the queue is empty
+    wakeup = None
+
+    @staticmethod
+    def init(manifest_path=None):
+        """
+        Queues everything up, without decoding anything until start is called.
+        :param manifest_path: JSON listing the images and sounds to preload, under "common".
+            Levels prefetch their own images as they come up.
+        """
+        AssetLoader.initialized = True
+        AssetLoader.condition = threading.Condition()
+        AssetLoader.queue = []
+        AssetLoader.priorities = {}
+        AssetLoader.in_progress = set()
+        AssetLoader.decoded = {}
+        AssetLoader.taken = set()
+
+        if manifest_path is not None:
+            for path in AssetLoader.manifest_paths(manifest_path):
+                AssetLoader.request(path, AssetLoader.LATER)
+
+    @staticmethod
+    def manifest_paths(manifest_path):
+        """
+        :return: Every image and sound the manifest lists, in the order they should load
+        """
+        with open(manifest_path) as file:
+            common = json.load(file).get("common", {})
+        return list(dict.fromkeys(common.get("images", []) + common.get("sounds", [])))
+
+    @staticmethod
+    def start():
+        """
+        Starts decoding in the background. In the web build this has to be called from inside
+        the running event loop.
+        """
+        if AssetLoader.is_web_build():
+            AssetLoader.wakeup = asyncio.Event()
+            # Kept so the task isn't garbage collected
+            AssetLoader.task = asyncio.create_task(AssetLoader.work_async())
+        else:
+            AssetLoader.thread = threading.Thread(target=AssetLoader.work, daemon=True)
+            AssetLoader.thread.start()
+
+    @staticmethod
+    def is_web_build():
+        return sys.platform == "emscripten"
+
+    @staticmethod
+    def request(path, priority=LATER):
+        """
+        Queues an asset to be decoded, or moves it up the queue if it's already waiting.
+        """
+        if not AssetLoader.initialized:
+            return
+        with AssetLoader.condition:
+            if path in AssetLoader.taken or path in AssetLoader.decoded or path in AssetLoader.in_progress:
+                return
+            if AssetLoader.priorities.get(path, priority + 1) <= priority:
+                return
+            AssetLoader.priorities[path] = priority
+            AssetLoader.sequence += 1
+            heapq.heappush(AssetLoader.queue, (priority, AssetLoader.sequence, path))
+            AssetLoader.condition.notify()
+        if AssetLoader.wakeup is not None:
+            AssetLoader.wakeup.set()
+
+    @staticmethod
+    def take(path):
+        """
+        Hands over a decoded asset, waiting for it if it's being decoded right now.
+        :return: The decoded surface or sound, or None if it hasn't been decoded
+        """
+        if not AssetLoader.initialized:
+            return None
+        with AssetLoader.condition:
+            AssetLoader.taken.add(path)
+            AssetLoader.priorities.pop(path, None)
+            while path in AssetLoader.in_progress:
+                AssetLoader.condition.wait()
+            return AssetLoader.decoded.pop(path, None)
+
+    @staticmethod
+    def forget(path):
+        """
+        Lets an asset be preloaded again, after its manager has dropped it.
+        """
+        if not AssetLoader.initialized:
+            return
+        with AssetLoader.condition:
+            AssetLoader.taken.discard(path)
+
+    @staticmethod
+    def next_path():
+        # Skips entries that were requested again at a higher priority, or already taken
+        while AssetLoader.queue:
+            priority, sequence, path = heapq.heappop(AssetLoader.queue)
+            if AssetLoader.priorities.get(path) == priority:
+                del AssetLoader.priorities[path]
+                AssetLoader.in_progress.add(path)
+                return path
+        return None
+
+    @staticmethod
+    def decode(path):
+        asset = None
+        try:
+            asset = AssetArchive.load(path)
+            if asset is None and path.endswith(".png"):
+                asset = pygame.image.load(path)
+            elif asset is None:
+                asset = pygame.mixer.Sound(path)
+        except (pygame.error, FileNotFoundError):
+            # Left for the manager to load, and fail, on the main thread
+            pass
+        finally:
+            # Even if decoding raised something else, take mustn't be left waiting on the path
+            with AssetLoader.condition:
+                AssetLoader.in_progress.discard(path)
+                if asset is not None and path not in AssetLoader.taken:
+                    AssetLoader.decoded[path] = asset
+                AssetLoader.condition.notify_all()
+
+    @staticmethod
+    def work():
+        while True:
+            with AssetLoader.condition:
+                path = AssetLoader.next_path()
+                while path is None:
+                    AssetLoader.condition.wait()
+                    path = AssetLoader.next_path()
+            AssetLoader.decode(path)
+
+    @staticmethod
+    async def work_async():
+        """
+        Stand in for the worker thread in the web build. Decodes one asset per turn of the
+        event loop, so a frame only ever waits on a single decode, and waits for a request
+        once the queue is empty.
+        """
+        while True:
+            path = AssetLoader.next_path()
+            if path is None:
+                AssetLoader.wakeup.clear()
+                await AssetLoader.wakeup.wait()
+                continue
+            AssetLoader.decode(path)
+            await asyncio.sleep(0)
+
+
+class AssetHandle:
+    """
+    Stands in for an asset, loading it through its manager whenever it's used. It holds no
+    reference to the asset itself, so the manager stays free to drop it.
+    """
+
+    def __init__(self, path, load):
+        self.path = path
+        self.load = load
+
+    def get(self):
+        return self.load(self.path)
+
+    def prefetch(self, priority=AssetLoader.SOON):
+        # Does nothing if the manager already holds the asset, as it's been taken
+        AssetLoader.request(self.path, priority)
@@ -0,0 +1,206 @@
+"""
+Times the per-frame hot paths headlessly, on every level, and compares them to stored baselines.
+
+    python -m benchmarks.hot_paths [--save] [--threshold 0.25] [--floor 1] [--baseline path] [--filter text]
+
+Anything more than threshold slower than its baseline, and by more than floor microseconds, is
+flagged, and the exit status is 1.
+--save records this run as the new baselines. Baselines only mean something on the machine
+that recorded them.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+import constants as c
+from Button import Button, ButtonGroup
+from image_manager import ImageManager
+from level_library import LevelLibrary
+from presenter import Presenter
+from sound_manager import SoundManager
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+# Each benchmark runs REPEAT batches of at least NUMBER calls, and reports the median batch.
+# Fast paths get more calls per batch, so every batch takes at least MIN_BATCH_TIME seconds.
+REPEAT = 7
+NUMBER = 200
+MIN_BATCH_TIME = 0.002
+
+
+class HeadlessGame:
+    """
+    Just enough of Game for MainFrame to run.
+    """
+    def shake(self, amt=15):
+        pass
+
+
+def mouse_positions(step=37):
+    """
+    Window positions spread over the play area, so placement is worked out afresh each call.
+    """
+    left, top = (int(value * c.WINDOW_SCALE) for value in c.LEVEL_POSITION)
+    width, height = (int(value * c.WINDOW_SCALE) for value in c.LEVEL_SIZE)
+    return [(x, y) for y in range(top, top + height, step) for x in range(left, left + width, step)]
+
+
+def measure(function, repeat=REPEAT, number=NUMBER):
+    """
+    :return: Median seconds per call
+    """
+    function()
+    then = time.perf_counter()
+    for _ in range(number):
+        function()
+    elapsed = time.perf_counter() - then
+    if elapsed < MIN_BATCH_TIME:
+        number = int(number * MIN_BATCH_TIME / max(elapsed, 1e-9)) + 1
+    batches = []
+    for _ in range(repeat):
+        then = time.perf_counter()
+        for _ in range(number):
+            function()
+        batches.append((time.perf_counter() - then) / number)
+    return statistics.median(batches)
+
+
+def moving_mouse(frame, function):
+    """
+    Wraps function so every call sees the next mouse position, like a frame does.
+    """
+    positions = mouse_positions()
+    index = [0]
+
+    def call():
+        index[0] = (index[0] + 1) % len(positions)
+        frame.mouse_position = positions[index[0]]
+        return function()
+    return call
+
+
+def frame_benchmarks(frame, surface, level_index):
+    frame.level_index = level_index
+    frame.load_active_level(LevelLibrary.get(level_index))
+    prefix = f"level_{level_index + 1}."
+    still = {
+        "update": lambda: frame.update(1 / c.FRAMERATE),
+        "draw_destination": lambda: frame.draw_destination(surface),
+        "draw_pickups": lambda: frame.draw_pickups(surface),
+        "draw_lines": lambda: frame.draw_lines(surface),
+        "draw_victory_message": lambda: frame.draw_victory_message(surface),
+    }
+    moving = {
+        "draw": lambda: frame.draw(surface),
+        "draw_mouse_cursor": lambda: frame.draw_mouse_cursor(surface),
+        "draw_points": lambda: frame.draw_points(surface),
+        "placement_point_is_valid": frame.placement_point_is_valid,
+        "remaining_pickups": frame.remaining_pickups,
+    }
+    benchmarks = {prefix + name: function for name, function in still.items()}
+    benchmarks.update({prefix + name: moving_mouse(frame, function) for name, function in moving.items()})
+    return benchmarks
+
+
+def button_benchmarks(surface):
+    button_surf = pygame.Surface((40, 16))
+    button_surf.fill((200, 200, 200))
+    button = Button(button_surf, (c.WINDOW_WIDTH // 2, c.WINDOW_HEIGHT // 2), hover_surf=button_surf)
+    # A level select sized grid, which should cost about the same to update as a few buttons
+    cell_surf = pygame.Surface((10, 8))
+    grid = ButtonGroup([Button(cell_surf, (8 + column * 11, 6 + row * 9))
+                        for row in range(15) for column in range(20)])
+    return {
+        "button.update": lambda: button.update(1 / c.FRAMERATE),
+        "button.draw": lambda: button.draw(surface),
+        "button_group.update": lambda: grid.update(1 / c.FRAMERATE),
+    }
+
+
+def run(name_filter=""):
+    """
+    :return: {benchmark name: seconds per call}
+    """
+    import frame as f
+
+    pygame.init()
+    ImageManager.init()
+    SoundManager.init()
+    presenter = Presenter(c.PRESENT_MODE)
+    surface = presenter.small_screen
+
+    main_frame = f.MainFrame(HeadlessGame())
+    main_frame.load()
+    benchmarks = {"present": presenter.present}
+    benchmarks.update(button_benchmarks(surface))
+
+    results = {}
+    # Levels share one frame, so each level's benchmarks run before the next is loaded
+    for level_index in range(LevelLibrary.count()):
+        benchmarks.update(frame_benchmarks(main_frame, surface, level_index))
+        for name, function in benchmarks.items():
+            if name_filter in name:
+                results[name] = measure(function)
+                main_frame.draw_log = []
+        benchmarks = {}
+    pygame.quit()
+    return results
+
+
+def compare(results, baselines, threshold, floor=0):
+    """
+    Prints each result next to its baseline.
+    :param floor: Seconds a benchmark has to slow down by as well, so timer noise on paths that
+        take well under a microsecond isn't flagged
+    :return: Names of the benchmarks slower than their baseline by more than threshold and floor
+    """
+    regressions = []
+    print(f"{'benchmark':<40}{'us':>10}{'baseline':>10}{'change':>9}")
+    for name, seconds in results.items():
+        line = f"{name:<40}{seconds * 1e6:>10.2f}"
+        if name in baselines:
+            change = seconds / baselines[name] - 1
+            line += f"{baselines[name] * 1e6:>10.2f}{change:>+9.0%}"
+            if change > threshold and seconds - baselines[name] > floor:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save", action="store_true", help="store this run as the baselines")
+    parser.add_argument("--threshold", type=float, default=0.25, help="slowdown flagged as a regression, as a fraction")
+    parser.add_argument("--floor", type=float, default=1, help="slowdown in microseconds also needed to be flagged")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baselines file")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    args = parser.parse_args()
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baselines = json.load(file)
+
+    results = run(args.filter)
+    regressions = compare(results, baselines, args.threshold, args.floor / 1e6)
+
+    if args.save:
+        baselines.update(results)
+        with open(args.baseline, "w") as file:
+            json.dump(baselines, file, indent=4, sort_keys=True)
+        print(f"Saved baselines to {args.baseline}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%} and {args.floor:g} us")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
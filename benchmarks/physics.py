@@ -0,0 +1,40 @@
+"""
+Compares updating PhysicsObjects one at a time with stepping them all in a PhysicsSystem.
+
+    python -m benchmarks.physics [bodies ...]
+"""
+import sys
+import timeit
+
+from primitives import PhysicsObject, PhysicsSystem
+
+
+def make_bodies(count, system=None):
+    bodies = []
+    for i in range(count):
+        body = PhysicsObject(None, (i % 240, i % 160), 0, system)
+        body.velocity.set_position((i % 7 - 3, -40))
+        body.acceleration.set_position((0, 98))
+        bodies.append(body)
+    return bodies
+
+
+def main(*counts):
+    dt = 1 / 60
+    print(f"{'bodies':>8}{'update ms':>12}{'step ms':>10}{'speedup':>9}")
+    for count in counts or (100, 1000, 5000):
+        bodies = make_bodies(count)
+        system = PhysicsSystem()
+        make_bodies(count, system)
+
+        def update_each():
+            for body in bodies:
+                body.update(dt, [])
+
+        each = min(timeit.repeat(update_each, number=10, repeat=5)) / 10
+        batched = min(timeit.repeat(lambda: system.step(dt), number=10, repeat=5)) / 10
+        print(f"{count:>8}{each * 1000:>12.3f}{batched * 1000:>10.3f}{each / batched:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,49 @@
+"""
+Compares the Presenter modes headlessly.
+
+    python -m benchmarks.present [frames]
+
+"transform" allocates a new window sized surface every frame, the other modes allocate nothing.
+"""
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+from presenter import Presenter
+
+
+def run(mode, frames):
+    # SDL can't switch an existing window to a scaled renderer, so start each mode afresh
+    pygame.display.quit()
+    pygame.display.init()
+    presenter = Presenter(mode)
+    small_screen = presenter.small_screen
+    for _ in range(10):
+        presenter.present()
+
+    times = []
+    for i in range(frames):
+        small_screen.fill((i % 256, 27, 45))
+        then = time.perf_counter()
+        presenter.present()
+        times.append(time.perf_counter() - then)
+    return times
+
+
+def main(frames=500):
+    pygame.init()
+    print(f"{'mode':<14}{'median ms':>10}{'p95 ms':>10}")
+    for mode in Presenter.MODES:
+        times = sorted(run(mode, frames))
+        print(f"{mode:<14}{statistics.median(times) * 1000:>10.3f}{times[int(len(times) * 0.95)] * 1000:>10.3f}")
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
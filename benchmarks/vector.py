@@ -0,0 +1,64 @@
+"""
+Compares primitives.Pose with primitives.Vector on the operations moving objects do every frame.
+
+    python -m benchmarks.vector [objects]
+"""
+import sys
+import timeit
+import tracemalloc
+
+from primitives import Pose, Vector
+
+
+def operations(cls, objects):
+    """
+    :return: {name: statement} run once per object, with equivalent work for both classes
+    """
+    poses = [cls((i, i * 0.5), i % 360) for i in range(objects)]
+    velocity = cls((3, -2), 0)
+    frame = cls((0, 0), 30)
+    statements = {
+        "construct": lambda: [cls((1.0, 2.0), 45) for _ in poses],
+        "add_pose weighted": lambda: [pose.add_pose(velocity, weight=1 / 60) for pose in poses],
+        "add_pose in frame": lambda: [pose.add_pose(velocity, weight=1 / 60, frame=frame) for pose in poses],
+        "a + b": lambda: [pose + velocity for pose in poses],
+        "a * k": lambda: [pose * 0.5 for pose in poses],
+        "scale_to": lambda: [pose.scale_to(10) for pose in poses],
+        "get_unit_vector": lambda: [pose.get_unit_vector() for pose in poses],
+    }
+    if cls is Vector:
+        # What moving objects would use instead of the allocating operators
+        statements["a += b"] = lambda: [pose.__iadd__(velocity) for pose in poses]
+        statements["a *= k"] = lambda: [pose.__imul__(1.0) for pose in poses]
+    return statements
+
+
+def bytes_per_object(cls, objects):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [cls((float(i), float(i)), 0) for i in range(objects)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del kept
+    return size / objects
+
+
+def main(objects=1000):
+    results = {cls: {name: min(timeit.repeat(statement, number=20, repeat=5)) / 20 / objects
+                     for name, statement in operations(cls, objects).items()}
+               for cls in (Pose, Vector)}
+
+    print(f"{objects} objects, nanoseconds per object")
+    print(f"{'operation':<20}{'Pose':>10}{'Vector':>10}{'speedup':>9}")
+    for name, seconds in results[Vector].items():
+        pose = results[Pose].get(name)
+        line = f"{name:<20}{pose * 1e9 if pose else float('nan'):>10.0f}{seconds * 1e9:>10.0f}"
+        if pose:
+            line += f"{pose / seconds:>8.2f}x"
+        print(line)
+    print(f"{'bytes per object':<20}{bytes_per_object(Pose, objects):>10.0f}{bytes_per_object(Vector, objects):>10.0f}")
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
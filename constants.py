@@ -10,6 +10,69 @@ WINDOW_SCALE = SCALED_WINDOW_WIDTH/WINDOW_WIDTH
 
 CAPTION = "Hop, Skip, Jump"
 FRAMERATE = 60
+# Steps per second the game is simulated at, whatever rate it's drawn at
+SIMULATION_RATE = 60
+# Longest frame that's simulated in full. Anything longer is played back slower instead of catching up.
+# Keep it well over an idle frame, 1 / IDLE_FRAMERATE, or the game falls behind while it's idle.
+MAX_FRAME_TIME = 0.1
+# Draw at most this many times a second, or None to draw every frame
+RENDER_FRAMERATE = None
+
+# Drop to IDLE_FRAMERATE once nothing has been pressed, moved or animated for IDLE_DELAY seconds,
+# sleeping between frames and waking as soon as input arrives
+ADAPTIVE_FRAMERATE = True
+IDLE_FRAMERATE = 20
+IDLE_DELAY = 1
+# Seconds between checks for input while sleeping
+IDLE_POLL_INTERVAL = 0.01
+
+WHITE = 255, 255, 255
+YELLOW = 255, 220, 80
+# Characters Button text can use, each rendered once into its glyph atlases
+CHARS = "".join(chr(code) for code in range(32, 127))
+
+# Only rescale and update the parts of the window that changed since the last frame
+DIRTY_RECTS = False
+
+# How the small screen gets onto the window, one of Presenter.MODES.
+# "preallocated" scales straight into the window surface, "sdl_scaled" lets SDL do the scaling,
+# and "transform" allocates a new scaled surface every frame.
+PRESENT_MODE = "preallocated"
+
+# Bytes of decoded images ImageManager keeps before forgetting the least recently used
+IMAGE_MEMORY_BUDGET = 32 * 1024 * 1024
+
+# Images and sounds AssetLoader decodes in the background at startup
+ASSET_MANIFEST = "assets/manifest.json"
+
+# Everything packed into one file by asset_archive.py. Loose files are used when it hasn't been built
+ASSET_ARCHIVE = "assets/assets.pak"
+# Stored as their original bytes, since they're streamed rather than decoded at load
+STREAMED_ASSETS = ("assets/sounds/music.wav",)
+
+# Only start what the first frame needs, and put off the music and background loading until it's shown
+LAZY_INIT = True
+# Print how long each phase of startup took, once the first frame is shown
+PROFILE_STARTUP = False
+
+# Time each phase of every frame. F3 toggles the HUD, and FRAME_PROFILE_LOG streams
+# every frame to a .csv or .jsonl file when it's set
+FRAME_PROFILER = False
+FRAME_PROFILE_LOG = None
+
+# Record every frame's input to this file, for replay.py to play back
+INPUT_RECORDING = None
+
+# Lists the levels in order, next to each level's data file
+LEVEL_INDEX = "assets/levels/levels.json"
+# Where compiled levels are kept, built by level_library.py or whenever a level is first loaded
+LEVEL_CACHE = "assets/levels/compiled"
 
 LEVEL_SIZE = 160, 147
-LEVEL_POSITION = 75, 6
\ No newline at end of file
+LEVEL_POSITION = 75, 6
+
+# Mark every end the next line can validly reach, while the cursor is over the level
+SHOW_REACHABLE_ARC = False
+
+DESTINATION_RADIUS = 8
+PICKUP_RADIUS = 5
@@ -1,11 +1,16 @@
 import math
-import time
+from collections import Counter
 
 import pygame
 
+from asset_loader import AssetLoader
+from game_clock import GameClock
 from image_manager import ImageManager
+from input_source import Input
+from level_library import LevelLibrary
 import constants as c
-from primitives import Pose
+from primitives import Vector
+from placement_offsets import candidate_offsets
 from sound_manager import SoundManager
 
 
@@ -17,12 +22,34 @@ class Frame:
     def load(self):
         pass
 
-    def update(self, dt, events):
+    def subscribe(self, bus):
+        """
+        Subscribes to the events this frame handles. Game unsubscribes everything owned by
+        the frame once it's done.
+        :param bus: Game's EventBus
+        """
         pass
 
+    def update(self, dt):
+        pass
+
+    def is_animating(self):
+        """
+        :return: Whether the frame would look different next frame without any input.
+            Game drops to c.IDLE_FRAMERATE when it isn't.
+        """
+        return True
+
     def draw(self, surface, offset=(0, 0)):
         surface.fill((128, 128, 128))
 
+    def dirty_rects(self):
+        """
+        Which parts of the screen the last draw changed, for Game's dirty rectangle mode.
+        :return: A list of rects in small screen space, or None if the whole screen may have changed
+        """
+        return None
+
     def next_frame(self):
         return Frame(self.game)
 
@@ -34,12 +61,15 @@ class TitleFrame(Frame):
     def load(self):
         pass
 
-    def update(self, dt, events):
+    def subscribe(self, bus):
+        bus.subscribe(pygame.KEYDOWN, self.on_key_down, owner=self)
 
-        for event in pygame.event.get():
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_RETURN:
-                    self.done = True
+    def on_key_down(self, event):
+        if event.key == pygame.K_RETURN:
+            self.done = True
+
+    def is_animating(self):
+        return False
 
     def draw(self, surface, offset=(0, 0)):
         surface.fill((255, 255, 255))
@@ -48,67 +78,48 @@ class TitleFrame(Frame):
         return MainFrame
 
 class MainFrame(Frame):
-    class Level:
-        def __init__(self, destination_position, start_position, level_surface, level_background, pickups, line_lengths):
-            self.destination_position = destination_position
-            self.start_position = start_position
-            self.level_surface = level_surface
-            self.level_background = level_background
+    # Seconds the level complete message takes to slide in, stays up, and takes to slide out
+    VICTORY_APPEAR_TIME = 0.3
+    VICTORY_STICK_TIME = 1
+    VICTORY_DISAPPEAR_TIME = 0.3
+
+    class Placement:
+        def __init__(self, end, valid, victory, pickups, remaining_pickups):
+            self.end = end
+            self.valid = valid
+            self.victory = victory
             self.pickups = pickups
-            self.line_lengths = line_lengths
+            self.remaining_pickups = remaining_pickups
 
     def load(self):
-        self.levels = [
-            MainFrame.Level(
-                (47, 35),
-                (110, 110),
-                ImageManager.load("assets/images/level_1.png"),
-                ImageManager.load("assets/images/level_1_background.png"),
-                [],
-                [75, 75]
-            ),
-            MainFrame.Level(
-                (46, 21),
-                (26, 41),
-                ImageManager.load("assets/images/level_2.png"),
-                ImageManager.load("assets/images/level_1_background.png"),
-                [(120, 116)],
-                [85, 85, 62, 62, 62]
-            ),
-            MainFrame.Level(
-                (22, 129),
-                (81, 72),
-                ImageManager.load("assets/images/level_3.png"),
-                ImageManager.load("assets/images/level_1_background.png"),
-                [(80, 15), (144, 86)],
-                [55, 18, 60, 65, 25, 100, 40, 25]
-            ),
-            MainFrame.Level(
-                (140, 19),
-                (122, 38),
-                ImageManager.load("assets/images/level_4.png"),
-                ImageManager.load("assets/images/level_1_background.png"),
-                [(17, 22), (55, 53), (147, 134)],
-                [30, 60, 60, 40, 90, 30, 30, 30, 75, 52, 35, 95]
-            ),
-            MainFrame.Level(
-                (15, 129),
-                (15, 15),
-                ImageManager.load("assets/images/level_1.png"),
-                ImageManager.load("assets/images/level_1_background.png"),
-                [],
-                [157, 157, 157, 157, 147]
-            ),
-        ]
         self.won = False
         self.level_index = 0
-        self.load_active_level(self.levels[self.level_index])
+        self.draw_log = []
+
+        # Used on every level, so they're pinned to keep them out of the way of eviction
+        self.cursor_surf = ImageManager.load("assets/images/cursor.png", pin=True)
+        self.cursor_surf.set_colorkey((0, 0, 0))
+        self.start_point_surf = ImageManager.load("assets/images/start_point.png", pin=True)
+        self.mid_point_surf = ImageManager.load("assets/images/regular_point.png", pin=True)
+        self.frame = ImageManager.load("assets/images/frme.png", pin=True)
+        self.destination_surface = ImageManager.load("assets/images/destination_unlocked.png", pin=True)
+        self.destination_surface_locked = ImageManager.load("assets/images/destination_locked.png", pin=True)
+        self.pickup_surface = ImageManager.load("assets/images/pickup.png", pin=True)
+
+        self.mouse_position = Input.mouse_position()
+        self.load_active_level(LevelLibrary.get(self.level_index))
 
         self.since_victory_shown = 99999
         self.new_level_loaded = True
-        self.level_complete_surf = ImageManager.load("assets/images/level_complete.png")
+        self.level_complete_surf = ImageManager.load("assets/images/level_complete.png", pin=True)
+        # The message only ever tilts by up to 35 degrees as it slides in and out, so every
+        # whole degree of that is rotated once up front. These are our own copies, so their
+        # alpha can be changed without touching the shared surface.
+        self.level_complete_frames = [pygame.transform.rotate(self.level_complete_surf, angle) for angle in range(36)]
+        self.victory_backdrop = pygame.Surface(c.WINDOW_SIZE)
+        self.victory_backdrop.fill((5, 27, 45))
         self.completely_won = False
-        self.you_win = ImageManager.load("assets/images/you_win.png")
+        self.you_win = ImageManager.load("assets/images/you_win.png", pin=True)
 
         self.place_sound = SoundManager.load("assets/sounds/placement.wav")
         self.pickup_sound = SoundManager.load("assets/sounds/pickup.wav")
@@ -119,145 +130,211 @@ class MainFrame(Frame):
         self.won = False
         self.new_level_loaded = True
         self.level_index += 1
-        if self.level_index > len(self.levels) - 1:
+        if self.level_index > LevelLibrary.count() - 1:
             self.completely_won = True
             return
-        self.load_active_level(self.levels[self.level_index])
+        self.load_active_level(LevelLibrary.get(self.level_index))
 
     def draw_victory_message(self, surface, offset=(0, 0)):
-        appear_time = 0.3
-        stick_time = 1
-        disappear_time = 0.3
+        appear_time = MainFrame.VICTORY_APPEAR_TIME
+        stick_time = MainFrame.VICTORY_STICK_TIME
+        disappear_time = MainFrame.VICTORY_DISAPPEAR_TIME
         alpha = 0
         xoff = offset[0]
         yoff = offset[1]
-        if (self.since_victory_shown < appear_time):
-            alpha = self.since_victory_shown/appear_time * 255
+        # Drawn between simulation steps, so it slides smoothly at any frame rate
+        since_victory_shown = self.since_victory_shown + GameClock.lag()
+        if (since_victory_shown < appear_time):
+            alpha = since_victory_shown/appear_time * 255
             yoff = (1 - alpha/255)**2 * 35
-        elif self.since_victory_shown < appear_time + stick_time or not self.new_level_loaded:
-            if (not self.new_level_loaded):
-                self.advance_level()
+        elif since_victory_shown < appear_time + stick_time or not self.new_level_loaded:
             alpha = 255
-        elif self.since_victory_shown < appear_time + stick_time + disappear_time:
-            since_start_disappear = self.since_victory_shown - appear_time - stick_time
+        elif since_victory_shown < appear_time + stick_time + disappear_time:
+            since_start_disappear = since_victory_shown - appear_time - stick_time
             alpha = 255 - since_start_disappear/disappear_time * 255
             yoff = (1 - alpha/255)**2 * -35
-        color = 5, 27, 45
-        back_surf = pygame.Surface(c.WINDOW_SIZE)
-        back_surf.fill(color)
-        back_surf.set_alpha(alpha)
         if (self.completely_won):
-            surface.blit(self.you_win, (0, 0))
-        surface.blit(back_surf, (0, 0))
-        self.level_complete_surf.set_alpha(alpha)
-        level_complete_surf = pygame.transform.rotate(self.level_complete_surf, abs(yoff) * 1)
-        surface.blit(level_complete_surf,
-                     (c.WINDOW_WIDTH//2 - level_complete_surf.get_width()//2 + xoff,
-                      c.WINDOW_HEIGHT//2 - level_complete_surf.get_height()//2 + yoff))
+            self.mark_dirty(surface.blit(self.you_win, (0, 0)), self.you_win)
+        if alpha <= 0:
+            return
+        self.victory_backdrop.set_alpha(alpha)
+        rect = surface.blit(self.victory_backdrop, (0, 0))
+        angle = min(round(abs(yoff)), len(self.level_complete_frames) - 1)
+        level_complete_surf = self.level_complete_frames[angle]
+        level_complete_surf.set_alpha(alpha)
+        position = (c.WINDOW_WIDTH//2 - level_complete_surf.get_width()//2 + xoff,
+                    c.WINDOW_HEIGHT//2 - level_complete_surf.get_height()//2 + yoff)
+        surface.blit(level_complete_surf, position)
+        self.mark_dirty(rect, alpha, position, angle)
 
 
     def load_active_level(self, level):
+        level.prefetch(AssetLoader.NOW)
+        if self.level_index + 1 < LevelLibrary.count():
+            LevelLibrary.get(self.level_index + 1).prefetch(AssetLoader.SOON)
         self.active_level = level
         self.points_placed = [self.active_level.start_position]
         self.level_lines = self.active_level.line_lengths
         self.destination_position = self.active_level.destination_position
         self.level_surface = self.active_level.level_surface
-        self.level_surface_dark = self.level_surface.copy()
-        black = self.level_surface_dark.copy()
-        black.fill((0, 0, 0))
-        self.level_surface_dark.blit(black, (0, 0), special_flags=pygame.BLEND_MULT)
+        self.level_surface_dark = self.active_level.make_level_surface_dark()
         self.level_background = self.active_level.level_background
-        self.cursor_surf = ImageManager.load("assets/images/cursor.png")
-        self.cursor_surf.set_colorkey((0, 0, 0))
-        self.start_point_surf = ImageManager.load("assets/images/start_point.png")
-        self.mid_point_surf = ImageManager.load("assets/images/regular_point.png")
-        self.frame = ImageManager.load("assets/images/frme.png")
-        self.destination_surface = ImageManager.load("assets/images/destination_unlocked.png")
-        self.destination_surface_locked = ImageManager.load("assets/images/destination_locked.png")
         self.pickups = self.active_level.pickups
-        self.pickups_per_move = []
-        self.destination_radius = 8
-        self.pickup_radius = 5
-        self.pickup_surface = ImageManager.load("assets/images/pickup.png")
-
-    def update(self, dt, events):
-        for event in events:
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                self.attempt_place_point()
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_BACKSPACE:
-                    self.undo()
-                if event.key == pygame.K_r:
-                    self.reset()
-                if event.key == pygame.K_ESCAPE:
-                    self.done = True
+        # What's left after each move, so undoing a move is just a pop
+        self.remaining_pickups_per_move = [tuple(self.pickups)]
+        self.destination_radius = c.DESTINATION_RADIUS
+        self.pickup_radius = c.PICKUP_RADIUS
+        # Bumped whenever the placed points change, so placement() knows to recompute
+        self.moves_version = 0
+        self.placement_key = None
+        self.placement_state = None
+        self.placement_line = Vector()
+        self.sweep_version = None
+        self.sweep = None
+        self.reachable_arc = None
+        # Worked out now so the first sweep of each line doesn't have to
+        for line_length in set(self.level_lines):
+            if line_length:
+                candidate_offsets(line_length)
+        self.bake_static_layers()
+        self.static_layers_changed = True
+
+    def bake_static_layers(self):
+        """
+        Composites everything that can't change until the next level into two surfaces.
+        The destination and pickups sit between the background and the walls, so the layers
+        are split around them.
+        """
+        self.static_under = pygame.Surface(c.WINDOW_SIZE)
+        self.static_under.fill((5, 27, 45))
+        self.static_under.blit(self.level_background, c.LEVEL_POSITION)
+
+        lx, ly = c.LEVEL_POSITION
+        self.static_over = pygame.Surface(c.WINDOW_SIZE, pygame.SRCALPHA)
+        self.static_over.blit(self.level_surface_dark, (lx, ly + 1))
+        self.static_over.blit(self.level_surface, (lx, ly))
+        self.static_over.blit(self.frame, (0, 0))
+
+    def subscribe(self, bus):
+        bus.subscribe(pygame.MOUSEBUTTONDOWN, self.on_mouse_down, owner=self)
+        bus.subscribe(pygame.KEYDOWN, self.on_key_down, owner=self)
+
+    def on_mouse_down(self, event):
+        # Events are handled before update, so the mouse may not have been read yet this frame
+        self.mouse_position = Input.mouse_position()
+        self.attempt_place_point()
+
+    def on_key_down(self, event):
+        if event.key == pygame.K_BACKSPACE:
+            self.undo()
+        if event.key == pygame.K_r:
+            self.reset()
+        if event.key == pygame.K_ESCAPE:
+            self.done = True
+
+    def update(self, dt):
+        self.mouse_position = Input.mouse_position()
         if self.won and self.new_level_loaded:
             self.new_level_loaded = False
             self.since_victory_shown = 0
             self.beat_level_sound.play()
         self.since_victory_shown += dt
+        # The next level loads behind the message, once it's fully faded in
+        if not self.new_level_loaded and self.since_victory_shown >= MainFrame.VICTORY_APPEAR_TIME:
+            self.advance_level()
+
+    def is_animating(self):
+        victory_time = MainFrame.VICTORY_APPEAR_TIME + MainFrame.VICTORY_STICK_TIME + MainFrame.VICTORY_DISAPPEAR_TIME
+        if not self.new_level_loaded or self.since_victory_shown < victory_time:
+            return True
+        # The destination's bob and the placement line's blink are slow enough for idle pacing
+        return False
 
     def undo(self):
         if self.won:
             return False
         if len(self.points_placed) > 1:
-            self.points_placed = self.points_placed[:-1]
-            self.pickups_per_move = self.pickups_per_move[:-1]
+            self.points_placed.pop()
+            self.remaining_pickups_per_move.pop()
+            self.moves_version += 1
             return True
         return False
 
     def reset(self):
         if self.won:
             return False
-        while self.undo():
-            continue
+        del self.points_placed[1:]
+        del self.remaining_pickups_per_move[1:]
+        self.moves_version += 1
+
+    def mark_dirty(self, rect, *details):
+        """
+        Records something drawn over the static layers this frame.
+        :param rect: The area it covered, as returned by blit or pygame.draw
+        :param details: Anything besides the area that affects how it looks
+        """
+        self.draw_log.append((tuple(rect), details))
+
+    def dirty_rects(self):
+        if self.static_layers_changed:
+            self.static_layers_changed = False
+            return None
+        # Anything drawn in exactly the same place the same way two frames in a row didn't change
+        changed = (Counter(self.draw_log) - Counter(self.previous_draw_log)) \
+            + (Counter(self.previous_draw_log) - Counter(self.draw_log))
+        return [pygame.Rect(rect) for rect in {rect for rect, details in changed}]
 
     def draw(self, surface, offset=(0, 0)):
-        surface.fill((5, 27, 45))
-
-        lx = c.LEVEL_POSITION[0] + offset[0]
-        ly = c.LEVEL_POSITION[1] + offset[1]
-        surface.blit(self.level_background, (lx, ly))
+        self.previous_draw_log = self.draw_log
+        self.draw_log = []
+        if offset[0] or offset[1]:
+            # The baked layer won't cover the edge it has been shaken away from
+            surface.fill((5, 27, 45))
+
+        # Keep the level where it would have been blitted on its own, fractional offsets included
+        lx = int(c.LEVEL_POSITION[0] + offset[0])
+        ly = int(c.LEVEL_POSITION[1] + offset[1])
+        layer_position = lx - c.LEVEL_POSITION[0], ly - c.LEVEL_POSITION[1]
+        surface.blit(self.static_under, layer_position)
         self.draw_destination(surface, offset)
         self.draw_pickups(surface, offset)
-        surface.blit(self.level_surface_dark, (lx, ly + 1))
-        surface.blit(self.level_surface, (lx, ly))
+        surface.blit(self.static_over, layer_position)
+
+        # The frame is baked in underneath the points now, so clip to the opening in it instead
+        clip = surface.get_clip()
+        surface.set_clip(pygame.Rect((lx, ly), c.LEVEL_SIZE))
+        self.draw_reachable_arc(surface, offset)
         self.draw_points(surface, offset)
-        surface.blit(self.frame, (offset[0], offset[1]))
+        surface.set_clip(clip)
         self.draw_mouse_cursor(surface, offset)
         self.draw_lines(surface, offset)
         self.draw_victory_message(surface, offset)
 
     def destination_unlocked(self):
-        remaining_pickups = self.pickups.copy()
-        for move in self.pickups_per_move:
-            for pickup in move:
-                if pickup in remaining_pickups:
-                    remaining_pickups.remove(pickup)
-        return len(remaining_pickups) == 0
+        return len(self.remaining_pickups()) == 0
 
     def draw_destination(self, surface, offset=(0, 0)):
         xoff, yoff = offset
         if (self.destination_unlocked()):
-            yoff += math.sin(time.time() * 10) * 1
+            yoff += math.sin(GameClock.render_time() * 10) * 1
         dest_surf = self.destination_surface if self.destination_unlocked() else self.destination_surface_locked
         pos = self.destination_position[0] + xoff + c.LEVEL_POSITION[0] - self.destination_surface.get_width()//2, \
               self.destination_position[1] + yoff + c.LEVEL_POSITION[1] - self.destination_surface.get_height()//2
-        surface.blit(dest_surf, (pos))
+        self.mark_dirty(surface.blit(dest_surf, (pos)), dest_surf)
 
     def draw_pickups(self, surface, offset=(0, 0)):
         for pickup in self.remaining_pickups():
             x, y = pickup
             x += offset[0] + c.LEVEL_POSITION[0] - self.pickup_surface.get_width()//2
             y += offset[1] + c.LEVEL_POSITION[1] - self.pickup_surface.get_height()//2
-            surface.blit(self.pickup_surface, (x, y))
+            self.mark_dirty(surface.blit(self.pickup_surface, (x, y)), self.pickup_surface)
 
 
     def next_frame(self):
         return MainFrame(self.game)
 
     def mouse_in_play_area(self):
-        mpos = pygame.mouse.get_pos()
+        mpos = self.mouse_position
         if mpos[0] < c.LEVEL_POSITION[0] * c.WINDOW_SCALE or mpos[0] > (c.LEVEL_POSITION[0] + c.LEVEL_SIZE[0])*c.WINDOW_SCALE:
             return False
         if mpos[1] < c.LEVEL_POSITION[1] * c.WINDOW_SCALE or mpos[1] > (c.LEVEL_POSITION[1] + c.LEVEL_SIZE[1]) * c.WINDOW_SCALE:
@@ -270,101 +347,142 @@ class MainFrame(Frame):
         return None
 
     def cursor_position_scaled(self):
-        mpos = pygame.mouse.get_pos()
+        mpos = self.mouse_position
         return mpos[0] / c.WINDOW_SCALE, mpos[1] / c.WINDOW_SCALE
 
-    def destination_position_scaled_level_space(self):
-        if (self.next_line_length()) == None:
-            return (0, 0)
+    def placement(self):
+        """
+        Everything derived from the cursor and the current move, computed once per change
+        to the cursor or the placed points instead of once per caller.
+        :return: A MainFrame.Placement for the current state
+        """
+        key = (self.mouse_position, self.moves_version)
+        if key != self.placement_key:
+            self.placement_key = key
+            self.placement_state = self.compute_placement()
+        return self.placement_state
+
+    def placement_sweep(self):
+        """
+        What placing the next line would do at every end it can reach. Only the cursor's
+        direction changes between moves, so this is worked out once per move, and the
+        cursor only has to find its end in it.
+        :return: {end: (valid, victory, pickups)}
+        """
+        if self.moves_version != self.sweep_version:
+            self.sweep_version = self.moves_version
+            self.sweep = self.compute_sweep()
+            self.reachable_arc = None
+        return self.sweep
+
+    def compute_sweep(self):
+        line_length = self.next_line_length()
+        if not line_length:
+            return {}
+        x, y = self.points_placed[-1]
+        return self.placement_outcomes([(x + dx, y + dy) for dx, dy in candidate_offsets(line_length)])
+
+    def placement_outcomes(self, ends):
+        """
+        Works out placing the next line at each of a batch of ends, with everything that
+        doesn't depend on the end looked up once for the whole batch.
+        :param ends: Where the next line could end, in level space
+        :return: {end: (valid, victory, pickups)}
+        """
+        remaining_pickups = self.remaining_pickups_per_move[-1]
+        line_length = self.next_line_length()
         start = self.points_placed[-1]
-        mpos = self.cursor_position_scaled()
-        mpos = mpos[0] - c.LEVEL_POSITION[0], mpos[1] - c.LEVEL_POSITION[1]
-        dx = mpos[0] - start[0]
-        dy = mpos[1] - start[1]
-        if dx == 0:
-            dx = 1  # avoid zero division
-        line = Pose((dx, dy))
-        line.scale_to(self.next_line_length())
-        end = start[0] + int(line.x), start[1] + int(line.y)
-        return end
+        wall_mask = self.active_level.wall_mask
+        width, height = wall_mask.width, wall_mask.height
+        # Anything off the level is invalid without tracing it
+        valid = [bool(line_length) and 0 <= x < width and 0 <= y < height and wall_mask.segment_is_clear(start, (x, y))
+                 for x, y in ends]
+
+        can_win = bool(line_length) and len(self.points_placed) >= len(self.level_lines) and not remaining_pickups
+        dest_x, dest_y = self.destination_position
+        destination_radius_squared = self.destination_radius**2
+        victory = [can_win and (x - dest_x)**2 + (y - dest_y)**2 < destination_radius_squared for x, y in ends]
+
+        pickup_radius_squared = self.pickup_radius**2
+        pickups = [[(x0, y0) for x0, y0 in remaining_pickups if (x - x0)**2 + (y - y0)**2 < pickup_radius_squared]
+                   for x, y in ends]
+        return dict(zip(ends, zip(valid, victory, pickups)))
+
+    def compute_placement(self):
+        remaining_pickups = self.remaining_pickups_per_move[-1]
+
+        line_length = self.next_line_length()
+        if line_length is None:
+            end = (0, 0)
+        else:
+            start = self.points_placed[-1]
+            mpos = self.cursor_position_scaled()
+            mpos = mpos[0] - c.LEVEL_POSITION[0], mpos[1] - c.LEVEL_POSITION[1]
+            dx = mpos[0] - start[0]
+            dy = mpos[1] - start[1]
+            if dx == 0:
+                dx = 1  # avoid zero division
+            line = self.placement_line
+            line.set_xy(dx, dy)
+            line.scale_to(line_length)
+            end = start[0] + int(line.x), start[1] + int(line.y)
+
+        sweep = self.placement_sweep()
+        if end not in sweep:
+            # The sweep walks the cursor's directions at its own resolution, so an end it
+            # didn't reach is worked out here, and kept in case the cursor comes back to it
+            sweep.update(self.placement_outcomes([end]))
+            # The arc is drawn from the sweep, so it has to be drawn again to show the new end
+            self.reachable_arc = None
+        valid, victory, pickups = sweep[end]
+        return MainFrame.Placement(end, valid, victory, pickups, remaining_pickups)
+
+    def destination_position_scaled_level_space(self):
+        return self.placement().end
 
     def draw_mouse_cursor(self, surface, offset=(0, 0)):
         return
         if not self.mouse_in_play_area():
             return # TODO cursor outside
 
-        mpos = pygame.mouse.get_pos()
+        mpos = self.mouse_position
         surface.blit(self.cursor_surf, (mpos[0] / c.WINDOW_SCALE + offset[0] - 6, mpos[1] / c.WINDOW_SCALE + offset[1] - 6))
 
     def placement_point_is_valid(self):
-        if not self.next_line_length():
-            return False
-        start = self.points_placed[-1]
-        end = self.destination_position_scaled_level_space()
-        dx = end[0] - start[0]
-        dy = end[1] - start[1]
-        for i in range(21):
-            through = i/20
-            x = start[0] + dx*through
-            y = start[1] + dy*through
-            if (x < 0 or x > c.LEVEL_SIZE[0] - 1 or y < 0 or y > c.LEVEL_SIZE[1] - 1):
-                return False
-            if (self.level_surface.get_at((int(x), int(y))).b > 200):
-                return False
-        return True
+        return self.placement().valid
 
     def placement_point_is_victory(self):
-        if not self.next_line_length():
-            return False
-        if len(self.points_placed) < len(self.level_lines):
-            return False
-        if self.remaining_pickups():
-            return False
-        end = self.destination_position_scaled_level_space()
-        dx = end[0] - self.destination_position[0]
-        dy = end[1] - self.destination_position[1]
-        if (dx**2 + dy**2 < self.destination_radius**2):
-            return True
-        return False
+        return self.placement().victory
 
     def attempt_place_point(self):
         if self.won:
             return False
         if self.next_line_length() is None:
             return False
-        if not self.placement_point_is_valid():
+        placement = self.placement()
+        if not placement.valid:
             self.game.shake(1)
             self.cant_place_sound.play()
             return False
-        if (self.placement_point_is_victory()):
+        if placement.victory:
             self.won = True
-        pickups_acquired = self.pickups_near_destination()
-        self.pickups_per_move.append(pickups_acquired)
+        pickups_acquired = placement.pickups
+        remaining_pickups = placement.remaining_pickups
         if pickups_acquired:
             self.pickup_sound.play()
-        self.points_placed.append(self.destination_position_scaled_level_space())
+            remaining_pickups = tuple(pickup for pickup in remaining_pickups if pickup not in pickups_acquired)
+        self.remaining_pickups_per_move.append(remaining_pickups)
+        self.points_placed.append(placement.end)
+        self.moves_version += 1
         self.game.shake(1)
         self.place_sound.play()
         return True
 
     def remaining_pickups(self):
-        remaining_pickups = self.pickups.copy()
-        for group in self.pickups_per_move:
-            for pickup in group:
-                if pickup in remaining_pickups:
-                    remaining_pickups.remove(pickup)
-        return remaining_pickups
+        return self.placement().remaining_pickups
 
     def pickups_near_destination(self):
-        remaining_pickups = self.remaining_pickups()
-        if not remaining_pickups:
-            return []
-        x, y = self.destination_position_scaled_level_space()
-        result = []
-        for x0, y0 in remaining_pickups:
-            if (x - x0)**2 + (y - y0)**2 < self.pickup_radius**2:
-                result.append((x0, y0))
-        return result
+        return self.placement().pickups
 
 
     def draw_lines(self, surface, offset=(0, 0)):
@@ -379,8 +497,6 @@ class MainFrame(Frame):
         y = 153
         dx = 5
         for i, line in [item for item in enumerate(self.level_lines)][::-1]:
-            rect_surf = pygame.Surface((2, (int(line*scale))))
-
             if (i < len(self.points_placed) - 1):
                 color = (42, 82, 114)
             elif i < len(self.points_placed):
@@ -391,10 +507,25 @@ class MainFrame(Frame):
             else:
                 color = (255, 255, 255)
 
-            rect_surf.fill(color)
-            surface.blit(rect_surf, (x + offset[0], y + offset[1] - rect_surf.get_height()))
+            rect_surf = ImageManager.solid((2, int(line*scale)), color)
+            self.mark_dirty(surface.blit(rect_surf, (x + offset[0], y + offset[1] - rect_surf.get_height())), color)
             x -= dx
 
+    def draw_reachable_arc(self, surface, offset=(0, 0)):
+        """
+        Marks every end the next line can validly reach, if c.SHOW_REACHABLE_ARC is on.
+        """
+        if not c.SHOW_REACHABLE_ARC or self.won or not self.mouse_in_play_area():
+            return
+        sweep = self.placement_sweep()
+        if self.reachable_arc is None:
+            self.reachable_arc = pygame.Surface(c.LEVEL_SIZE, pygame.SRCALPHA)
+            for end, (valid, victory, pickups) in sweep.items():
+                if valid:
+                    self.reachable_arc.set_at(end, (255, 255, 0, 160) if victory or pickups else (0, 255, 0, 96))
+        position = c.LEVEL_POSITION[0] + offset[0], c.LEVEL_POSITION[1] + offset[1]
+        self.mark_dirty(surface.blit(self.reachable_arc, position), self.reachable_arc)
+
     def draw_points(self, surface, offset=(0, 0)):
         last_point = None
         for i, point in enumerate(self.points_placed):
@@ -411,43 +542,37 @@ class MainFrame(Frame):
             if last_point != None:
                 x1 = last_point[0]
                 y1 = last_point[1]
-                pygame.draw.line(surface, (5, 27, 45, 128), (x + offset[0], y + offset[1] + 2),
-                                 (x1 + offset[0], y1 + offset[1] + 2), width=2)
-                pygame.draw.line(surface, (255, 255, 255), (x + offset[0], y + offset[1]), (x1 + offset[0], y1 + offset[1]), width=2)
+                self.mark_dirty(pygame.draw.line(surface, (5, 27, 45, 128), (x + offset[0], y + offset[1] + 2),
+                                                 (x1 + offset[0], y1 + offset[1] + 2), width=2), (x1, y1))
+                self.mark_dirty(pygame.draw.line(surface, (255, 255, 255), (x + offset[0], y + offset[1]),
+                                                 (x1 + offset[0], y1 + offset[1]), width=2), (x1, y1))
             last_point = x, y
-            surface.blit(surf, (x + offset[0] - surf.get_width()//2, y + offset[1] - surf.get_width()//2))
+            self.mark_dirty(surface.blit(surf, (x + offset[0] - surf.get_width()//2, y + offset[1] - surf.get_width()//2)), surf)
 
         if self.mouse_in_play_area() and last_point is not None and self.next_line_length() is not None:
             start = last_point
-            mpos = self.cursor_position_scaled()
-            dx = mpos[0] - start[0]
-            dy = mpos[1] - start[1]
-            if dx == 0:
-                dx = 1 # avoid zero division
-            line = Pose((dx, dy))
-            line.scale_to(self.next_line_length())
-            end = start[0] + int(line.x), start[1] + int(line.y)
+            end = self.placement().end
+            end = end[0] + c.LEVEL_POSITION[0], end[1] + c.LEVEL_POSITION[1]
 
             color = self.placement_line_color()
 
-            pygame.draw.line(surface, (5, 27, 45), (start[0] + offset[0], start[1] + offset[1] + 1), (end[0] + offset[0], end[1] + offset[1] + 1), width=2)
-            pygame.draw.line(surface, color, (start[0] + offset[0], start[1] + offset[1]), (end[0] + offset[0], end[1] + offset[1]), width=2)
+            self.mark_dirty(pygame.draw.line(surface, (5, 27, 45), (start[0] + offset[0], start[1] + offset[1] + 1),
+                                             (end[0] + offset[0], end[1] + offset[1] + 1), width=2), start, end)
+            self.mark_dirty(pygame.draw.line(surface, color, (start[0] + offset[0], start[1] + offset[1]),
+                                             (end[0] + offset[0], end[1] + offset[1]), width=2), start, end, color)
 
-            cursor = self.cursor_surf.copy()
-            cursor_fill = cursor.copy()
-            cursor_fill.fill(color)
-            cursor.blit(cursor_fill, (0, 0), special_flags=pygame.BLEND_MULT)
-            surface.blit(cursor,
-                         (end[0] + offset[0] - 6, end[1] + offset[1] - 6))
+            cursor = ImageManager.load_tinted("assets/images/cursor.png", color)
+            self.mark_dirty(surface.blit(cursor, (end[0] + offset[0] - 6, end[1] + offset[1] - 6)), color)
 
     def show_placement_line(self):
-        return time.time() % 0.5 < 0.25
+        return GameClock.render_time() % 0.5 < 0.25
 
     def placement_line_color(self):
         alpha = 0 if not self.show_placement_line() else 255
-        if not self.placement_point_is_valid():
+        placement = self.placement()
+        if not placement.valid:
             return (255, 0, 0, alpha)
-        if self.placement_point_is_victory() or self.pickups_near_destination():
+        if placement.victory or placement.pickups:
             return (255, 255, 0, alpha)
         return (0, 255, 0, alpha)
 
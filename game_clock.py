@@ -0,0 +1,58 @@
+import constants as c
+
+
+class GameClock:
+    """
+    Static class that turns frame times into fixed simulation steps of STEP seconds. Game
+    steps the simulation through it, and anything animated reads the time from here, so the
+    game plays the same at any frame rate.
+
+    Time left over after the last whole step is kept for the next frame. Drawing adds it back
+    on, with render_time and lag, so motion stays smooth between steps.
+    """
+
+    STEP = 1 / c.SIMULATION_RATE
+
+    steps = 0
+    # Seconds of frame time that haven't been simulated yet, always less than STEP
+    accumulator = 0
+
+    @staticmethod
+    def reset():
+        GameClock.steps = 0
+        GameClock.accumulator = 0
+
+    @staticmethod
+    def advance(dt):
+        """
+        Adds a frame's worth of time.
+        :param dt: Seconds since the last frame. Anything over c.MAX_FRAME_TIME is dropped,
+            so a stall doesn't have to be caught up on all at once.
+        :return: How many steps to simulate this frame
+        """
+        accumulator = GameClock.accumulator + min(dt, c.MAX_FRAME_TIME)
+        steps = int(accumulator // GameClock.STEP)
+        GameClock.accumulator = accumulator - steps * GameClock.STEP
+        GameClock.steps += steps
+        return steps
+
+    @staticmethod
+    def time():
+        """
+        :return: Seconds simulated since the game started
+        """
+        return GameClock.steps * GameClock.STEP
+
+    @staticmethod
+    def lag():
+        """
+        :return: Seconds of frame time past the last step, for drawing timers between steps
+        """
+        return GameClock.accumulator
+
+    @staticmethod
+    def render_time():
+        """
+        :return: The simulation time to draw at
+        """
+        return GameClock.time() + GameClock.accumulator
@@ -1,18 +1,39 @@
+import time
+from collections import OrderedDict
+
 import pygame
 import constants as c
+from asset_archive import AssetArchive
+from asset_loader import AssetLoader, AssetHandle
+from startup_timer import StartupTimer
 
 class ImageManager:
     """
-    Static class to handle loading of pygame surfaces to improve performance
+    Static class to handle loading of pygame surfaces to improve performance.
+    Loaded images are kept within c.IMAGE_MEMORY_BUDGET bytes by forgetting the least recently
+    used ones first, except for any that are pinned.
     """
 
     initialized = False
-    sounds = None
+    images = None
+    sprites = None
+    pins = None
+    memory = 0
+    hits = 0
+    misses = 0
+    evictions = 0
+
+    # Most tinted or solid sprites the cache holds before dropping the least recently used
+    SPRITE_CACHE_SIZE = 128
 
     @staticmethod
     def init():
         ImageManager.initialized = True
-        ImageManager.sounds = {}
+        ImageManager.images = OrderedDict()
+        ImageManager.sprites = OrderedDict()
+        ImageManager.pins = set()
+        ImageManager.memory = 0
+        ImageManager.reset_stats()
 
     @staticmethod
     def check_initialized():
@@ -27,8 +48,8 @@ class ImageManager:
         :return:
         """
         ImageManager.check_initialized()
-        if path in ImageManager.sounds:
-            del ImageManager.sounds[path]
+        if path in ImageManager.images:
+            ImageManager.memory -= ImageManager.surface_bytes(ImageManager.images.pop(path))
 
     @staticmethod
     def clear_all():
@@ -36,22 +57,173 @@ class ImageManager:
         Forgets everything
         """
         ImageManager.check_initialized()
-        ImageManager.sounds = {}
+        ImageManager.images = OrderedDict()
+        ImageManager.sprites = OrderedDict()
+        ImageManager.memory = 0
 
     @staticmethod
-    def load(path):
+    def load(path, pin=False):
         """
         Loads a surface from file or from cache
         :param path: The path of the image
+        :param pin: Whether to also pin the image, so it is never evicted
         :return: The surface. This is likely the same reference others are using, so don't be destructive.
         """
         ImageManager.check_initialized()
-        if path in ImageManager.sounds:
-            return ImageManager.sounds[path]
-        sound = pygame.image.load(path).convert_alpha()
-        ImageManager.sounds[path] = sound
-        return sound
+        if pin:
+            ImageManager.pin(path)
+        images = ImageManager.images
+        if path in images:
+            ImageManager.hits += 1
+            images.move_to_end(path)
+            return images[path]
+        ImageManager.misses += 1
+        started = time.perf_counter()
+        image = AssetLoader.take(path)
+        if image is None:
+            image = AssetArchive.image(path)
+        if image is None:
+            image = pygame.image.load(path)
+        image = image.convert_alpha()
+        StartupTimer.add("asset decode", time.perf_counter() - started)
+        images[path] = image
+        ImageManager.memory += ImageManager.surface_bytes(image)
+        ImageManager.evict()
+        return image
+
+    @staticmethod
+    def load_lazy(path, priority=AssetLoader.LATER):
+        """
+        Queues an image to be decoded in the background
+        :param path: The path of the image
+        :param priority: How soon it's likely to be needed, as an AssetLoader priority
+        :return: An AssetHandle that loads the image the first time it's used
+        """
+        AssetLoader.request(path, priority)
+        return AssetHandle(path, ImageManager.load)
+
+    @staticmethod
+    def pin(path):
+        """
+        Keeps an image in memory however long ago it was used, until it's unpinned.
+        :param path: The path of the image
+        """
+        ImageManager.check_initialized()
+        ImageManager.pins.add(path)
+
+    @staticmethod
+    def unpin(path):
+        ImageManager.check_initialized()
+        ImageManager.pins.discard(path)
+        ImageManager.evict()
+
+    @staticmethod
+    def evict():
+        """
+        Forgets the least recently used unpinned images until the cache fits in its budget.
+        The most recently loaded image is always kept, even if it's over budget by itself.
+        """
+        images = ImageManager.images
+        if ImageManager.memory <= c.IMAGE_MEMORY_BUDGET:
+            return
+        for path in list(images)[:-1]:
+            if path in ImageManager.pins:
+                continue
+            ImageManager.memory -= ImageManager.surface_bytes(images.pop(path))
+            ImageManager.evictions += 1
+            AssetLoader.forget(path)
+            if ImageManager.memory <= c.IMAGE_MEMORY_BUDGET:
+                return
+
+    @staticmethod
+    def surface_bytes(surface):
+        return surface.get_pitch() * surface.get_height()
+
+    @staticmethod
+    def memory_usage():
+        """
+        Reports how much memory each cached surface takes, largest first
+        :return: A list of (path or sprite key, bytes)
+        """
+        ImageManager.check_initialized()
+        usage = [(path, ImageManager.surface_bytes(image)) for path, image in ImageManager.images.items()]
+        usage += [(key, ImageManager.surface_bytes(sprite)) for key, sprite in ImageManager.sprites.items()]
+        return sorted(usage, key=lambda item: item[1], reverse=True)
+
+    @staticmethod
+    def total_memory():
+        """
+        :return: Bytes taken by every cached surface, images and sprites together
+        """
+        return sum(size for key, size in ImageManager.memory_usage())
+
+    @staticmethod
+    def reset_stats():
+        ImageManager.hits = 0
+        ImageManager.misses = 0
+        ImageManager.evictions = 0
+
+    @staticmethod
+    def stats():
+        return {
+            "hits": ImageManager.hits,
+            "misses": ImageManager.misses,
+            "evictions": ImageManager.evictions,
+            "images": len(ImageManager.images),
+            "pinned": len(ImageManager.pins),
+            "image_bytes": ImageManager.memory,
+            "budget_bytes": c.IMAGE_MEMORY_BUDGET,
+        }
 
     @staticmethod
     def load_copy(path):
-        return ImageManager.load(path).copy()
\ No newline at end of file
+        return ImageManager.load(path).copy()
+
+    @staticmethod
+    def cached_sprite(key, make):
+        """
+        Gets a generated surface from cache, or makes and caches it
+        :param key: (source, color, size)
+        :param make: Function that creates the surface if it isn't cached
+        :return: The surface. This is shared, so don't be destructive.
+        """
+        ImageManager.check_initialized()
+        sprites = ImageManager.sprites
+        if key in sprites:
+            sprites.move_to_end(key)
+            return sprites[key]
+        sprite = make()
+        sprites[key] = sprite
+        if len(sprites) > ImageManager.SPRITE_CACHE_SIZE:
+            sprites.popitem(last=False)
+        return sprite
+
+    @staticmethod
+    def load_tinted(path, color):
+        """
+        Loads an image multiplied by a color
+        :param path: The path of the image
+        :param color: The color to multiply by
+        :return: The tinted surface. This is shared, so don't be destructive.
+        """
+        def make():
+            sprite = ImageManager.load_copy(path)
+            fill = sprite.copy()
+            fill.fill(color)
+            sprite.blit(fill, (0, 0), special_flags=pygame.BLEND_MULT)
+            return sprite
+        return ImageManager.cached_sprite((path, tuple(color), None), make)
+
+    @staticmethod
+    def solid(size, color):
+        """
+        Gets a surface filled with one color
+        :param size: The size of the surface
+        :param color: The fill color
+        :return: The surface. This is shared, so don't be destructive.
+        """
+        def make():
+            sprite = pygame.Surface(size)
+            sprite.fill(color)
+            return sprite
+        return ImageManager.cached_sprite((None, tuple(color), tuple(size)), make)
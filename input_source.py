@@ -0,0 +1,162 @@
+import atexit
+import gzip
+import json
+
+import pygame
+
+
+class LiveInput:
+    """
+    Reads the real frame times, event queue and mouse.
+    """
+
+    def tick(self, clock, framerate):
+        """
+        Waits for the next frame.
+        :return: Seconds since the last frame
+        """
+        return clock.tick(framerate) / 1000
+
+    def events(self):
+        """
+        :return: The events that came in since the last frame
+        """
+        return pygame.event.get()
+
+    def mouse_position(self):
+        return LiveInput.read_mouse()
+
+    @staticmethod
+    def read_mouse():
+        """
+        :return: Where the mouse is, in pixels of the c.SCALED_WINDOW_SIZE window
+        """
+        x, y = pygame.mouse.get_pos()
+        return x * Input.pointer_scale, y * Input.pointer_scale
+
+    def finished(self):
+        return False
+
+    def input_pending(self):
+        """
+        :return: Whether there are events waiting, which should wake an idle game
+        """
+        return pygame.event.peek()
+
+
+class RecordingInput(LiveInput):
+    """
+    Plays live, writing every frame to a gzipped file of JSON lines for ReplayInput to play back.
+    The mouse is read once at the start of each frame, so a replay sees the same position.
+    """
+
+    def __init__(self, path):
+        self.file = gzip.open(path, "wt")
+        atexit.register(self.file.close)
+        self.position = LiveInput.read_mouse()
+        self.dt = 0
+
+    def tick(self, clock, framerate):
+        self.dt = super().tick(clock, framerate)
+        return self.dt
+
+    def events(self):
+        events = super().events()
+        self.position = LiveInput.read_mouse()
+        recorded_events = [[event.type, event.dict] for event in events if event.type in ReplayInput.EVENT_TYPES]
+        # Events can carry things JSON can't store, like the window they happened in, so those are dropped
+        self.file.write(json.dumps([self.dt, self.position, recorded_events], default=lambda value: None) + "\n")
+        return events
+
+    def mouse_position(self):
+        return self.position
+
+
+class ReplayInput:
+    """
+    Plays back a file written by RecordingInput, as fast as possible rather than in real time.
+    """
+
+    # Events the game reacts to, which are the only ones recorded
+    EVENT_TYPES = pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP
+
+    def __init__(self, path, dt=None):
+        """
+        :param path: A recording from RecordingInput
+        :param dt: Seconds every frame lasts, instead of the recorded frame times
+        """
+        with gzip.open(path, "rt") as file:
+            self.frames = [json.loads(line) for line in file]
+        self.fixed_dt = dt
+        self.index = -1
+        self.position = tuple(self.frames[0][1]) if self.frames else (0, 0)
+
+    def tick(self, clock, framerate):
+        # Doesn't wait, so the replay runs as fast as it can
+        self.index += 1
+        dt, position, events = self.frames[self.index]
+        if self.fixed_dt is not None:
+            dt = self.fixed_dt
+        self.position = tuple(position)
+        return dt
+
+    def events(self):
+        # Keep SDL serviced, but only the recorded events reach the game
+        pygame.event.pump()
+        events = self.frames[self.index][2]
+        return [pygame.event.Event(event_type, ReplayInput.restore(attributes)) for event_type, attributes in events]
+
+    @staticmethod
+    def restore(attributes):
+        # JSON turns tuples like pos into lists
+        return {key: tuple(value) if isinstance(value, list) else value for key, value in attributes.items()}
+
+    def mouse_position(self):
+        return self.position
+
+    def finished(self):
+        return self.index + 1 >= len(self.frames)
+
+    def input_pending(self):
+        # The next frame is always ready, so a replay never sleeps
+        return True
+
+
+class Input:
+    """
+    Static class that everything reads the mouse and frame times through, so a recording can
+    stand in for the player.
+    """
+
+    source = LiveInput()
+    # What the mouse position SDL reports is multiplied by to get window pixels
+    pointer_scale = 1
+
+    @staticmethod
+    def init(source=None, pointer_scale=1):
+        """
+        :param source: LiveInput, RecordingInput or ReplayInput. Defaults to LiveInput.
+        :param pointer_scale: The Presenter's pointer_scale
+        """
+        Input.source = source if source is not None else LiveInput()
+        Input.pointer_scale = pointer_scale
+
+    @staticmethod
+    def tick(clock, framerate):
+        return Input.source.tick(clock, framerate)
+
+    @staticmethod
+    def events():
+        return Input.source.events()
+
+    @staticmethod
+    def mouse_position():
+        return Input.source.mouse_position()
+
+    @staticmethod
+    def finished():
+        return Input.source.finished()
+
+    @staticmethod
+    def input_pending():
+        return Input.source.input_pending()
@@ -0,0 +1,246 @@
+import hashlib
+import json
+import os
+import struct
+
+import pygame
+
+import constants as c
+from image_manager import ImageManager
+from wall_mask import WallMask
+
+
+class Level:
+    def __init__(self, destination_position, start_position, level_surface, level_background, pickups, line_lengths,
+                 compiled=None):
+        """
+        :param level_surface: AssetHandle for the walls, only loaded once the level is used
+        :param level_background: AssetHandle for the background
+        :param compiled: CompiledLevel with the wall mask and darkened walls already worked out
+        """
+        self.destination_position = destination_position
+        self.start_position = start_position
+        self.level_surface_handle = level_surface
+        self.level_background_handle = level_background
+        self.pickups = pickups
+        self.line_lengths = line_lengths
+        self.compiled = compiled
+        self.wall_mask_cache = compiled.wall_mask if compiled is not None else None
+
+    @property
+    def level_surface(self):
+        return self.level_surface_handle.get()
+
+    @property
+    def level_background(self):
+        return self.level_background_handle.get()
+
+    @property
+    def wall_mask(self):
+        if self.wall_mask_cache is None:
+            self.wall_mask_cache = WallMask.from_surface(self.level_surface)
+        return self.wall_mask_cache
+
+    def make_level_surface_dark(self):
+        """
+        :return: A new surface of the walls in black, for the shadow under them
+        """
+        if self.compiled is not None:
+            return self.compiled.dark_surface().convert_alpha()
+        return darken(self.level_surface)
+
+    def prefetch(self, priority):
+        self.level_surface_handle.prefetch(priority)
+        self.level_background_handle.prefetch(priority)
+
+
+def darken(surface):
+    dark = surface.copy()
+    black = dark.copy()
+    black.fill((0, 0, 0))
+    dark.blit(black, (0, 0), special_flags=pygame.BLEND_MULT)
+    return dark
+
+
+class CompiledLevel:
+    """
+    Everything about a level that takes work to derive from its images, stored in one file.
+    The layout is MAGIC, then four little endian uint32 lengths for the metadata, wall rows,
+    wall columns and darkened pixels, then each of those in turn.
+    """
+
+    MAGIC = b"LD58LVL1"
+    HEADER = struct.Struct("<4I")
+
+    def __init__(self, metadata, wall_mask, dark_pixels):
+        """
+        :param metadata: The level's data file contents, plus the size of its walls
+        :param wall_mask: WallMask of the walls
+        :param dark_pixels: RGBA bytes of the darkened walls
+        """
+        self.metadata = metadata
+        self.wall_mask = wall_mask
+        self.dark_pixels = dark_pixels
+
+    def dark_surface(self):
+        return pygame.image.frombuffer(self.dark_pixels, (self.wall_mask.width, self.wall_mask.height), "RGBA")
+
+    @staticmethod
+    def compile(metadata):
+        walls = pygame.image.load(metadata["walls"])
+        # Walls can be palettized, and need darkening the way ImageManager's converted copy would be
+        walls = pygame.image.frombytes(pygame.image.tobytes(walls, "RGBA"), walls.get_size(), "RGBA")
+        wall_mask = WallMask.from_surface(walls)
+        dark_pixels = pygame.image.tobytes(darken(walls), "RGBA")
+        return CompiledLevel(dict(metadata, size=walls.get_size()), wall_mask, dark_pixels)
+
+    def to_bytes(self):
+        metadata = json.dumps(self.metadata).encode()
+        rows, columns = self.wall_mask.pack()
+        return b"".join((CompiledLevel.MAGIC,
+                         CompiledLevel.HEADER.pack(len(metadata), len(rows), len(columns), len(self.dark_pixels)),
+                         metadata, rows, columns, self.dark_pixels))
+
+    @staticmethod
+    def from_bytes(data):
+        if data[:len(CompiledLevel.MAGIC)] != CompiledLevel.MAGIC:
+            raise ValueError("Not a compiled level")
+        offset = len(CompiledLevel.MAGIC) + CompiledLevel.HEADER.size
+        sections = []
+        for length in CompiledLevel.HEADER.unpack(data[len(CompiledLevel.MAGIC):offset]):
+            sections.append(data[offset:offset + length])
+            offset += length
+        metadata, rows, columns, dark_pixels = sections
+        metadata = json.loads(metadata)
+        wall_mask = WallMask.unpack(*metadata["size"], rows, columns)
+        return CompiledLevel(metadata, wall_mask, dark_pixels)
+
+
+class LevelLibrary:
+    """
+    Static class that loads levels from their data files the first time they're asked for,
+    and keeps them for every MainFrame after.
+
+    The index at c.LEVEL_INDEX lists the levels in order. Each has a JSON data file in the same
+    directory, with its start, destination, pickups, line lengths and images. Compiled levels
+    in c.LEVEL_CACHE are named after a hash of the data file and the wall image, so editing
+    either one means it's compiled again.
+    """
+
+    names = None
+    levels = None
+
+    @staticmethod
+    def check_loaded():
+        if LevelLibrary.names is None:
+            with open(c.LEVEL_INDEX) as file:
+                LevelLibrary.names = json.load(file)["levels"]
+            LevelLibrary.levels = {}
+
+    @staticmethod
+    def count():
+        LevelLibrary.check_loaded()
+        return len(LevelLibrary.names)
+
+    @staticmethod
+    def get(index):
+        """
+        :param index: Which level, starting at 0
+        :return: The Level, loaded from its data file and compiled level if this is the first time
+        """
+        LevelLibrary.check_loaded()
+        if index not in LevelLibrary.levels:
+            LevelLibrary.levels[index] = LevelLibrary.load(LevelLibrary.names[index])
+        return LevelLibrary.levels[index]
+
+    @staticmethod
+    def asset_paths():
+        """
+        :return: The images every level uses, in level order, for asset_archive.py to pack
+        """
+        LevelLibrary.check_loaded()
+        paths = []
+        for name in LevelLibrary.names:
+            with open(LevelLibrary.data_path(name)) as file:
+                metadata = json.load(file)
+            paths += [metadata["walls"], metadata["background"]]
+        return list(dict.fromkeys(paths))
+
+    @staticmethod
+    def data_path(name):
+        return os.path.join(os.path.dirname(c.LEVEL_INDEX), f"{name}.json")
+
+    @staticmethod
+    def read_source(name):
+        """
+        :return: The level's metadata, and the hash its compiled file is named after
+        """
+        with open(LevelLibrary.data_path(name), "rb") as file:
+            data = file.read()
+        metadata = json.loads(data)
+        with open(metadata["walls"], "rb") as file:
+            walls = file.read()
+        digest = hashlib.sha1(CompiledLevel.MAGIC + data + walls).hexdigest()[:16]
+        return metadata, digest
+
+    @staticmethod
+    def compiled_path(name, digest):
+        return os.path.join(c.LEVEL_CACHE, f"{name}.{digest}.lvl")
+
+    @staticmethod
+    def compile(name):
+        """
+        Compiles a level and writes it to the cache, unless it's already there.
+        :return: The CompiledLevel
+        """
+        metadata, digest = LevelLibrary.read_source(name)
+        path = LevelLibrary.compiled_path(name, digest)
+        if os.path.exists(path):
+            with open(path, "rb") as file:
+                return CompiledLevel.from_bytes(file.read())
+
+        compiled = CompiledLevel.compile(metadata)
+        try:
+            os.makedirs(c.LEVEL_CACHE, exist_ok=True)
+            with open(path, "wb") as file:
+                file.write(compiled.to_bytes())
+        except OSError:
+            # A read only install still plays, it just compiles each level when it's loaded
+            pass
+        return compiled
+
+    @staticmethod
+    def load(name):
+        compiled = LevelLibrary.compile(name)
+        metadata = compiled.metadata
+        return Level(tuple(metadata["destination"]),
+                     tuple(metadata["start"]),
+                     ImageManager.load_lazy(metadata["walls"]),
+                     ImageManager.load_lazy(metadata["background"]),
+                     [tuple(pickup) for pickup in metadata["pickups"]],
+                     metadata["line_lengths"],
+                     compiled)
+
+    @staticmethod
+    def clear_stale():
+        """
+        Deletes compiled levels that no longer match their sources.
+        """
+        LevelLibrary.check_loaded()
+        current = {os.path.basename(LevelLibrary.compiled_path(name, LevelLibrary.read_source(name)[1]))
+                   for name in LevelLibrary.names}
+        if not os.path.isdir(c.LEVEL_CACHE):
+            return
+        for file_name in os.listdir(c.LEVEL_CACHE):
+            if file_name.endswith(".lvl") and file_name not in current:
+                os.remove(os.path.join(c.LEVEL_CACHE, file_name))
+
+
+if __name__ == "__main__":
+    # Compiles every level ahead of time, so none need compiling while the game runs
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    LevelLibrary.check_loaded()
+    for level_name in LevelLibrary.names:
+        LevelLibrary.compile(level_name)
+        print(f"Compiled {level_name}")
+    LevelLibrary.clear_stale()
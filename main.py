@@ -1,3 +1,5 @@
+from startup_timer import StartupTimer
+
 import math
 
 import pygame
@@ -6,30 +8,114 @@ import constants as c
 import frame as f
 import sys
 
-from primitives import Pose
+from game_clock import GameClock
+from primitives import Vector
 from sound_manager import SoundManager
+from asset_archive import AssetArchive
+from asset_loader import AssetLoader
 from image_manager import ImageManager
+from presenter import Presenter
+from profiler import FrameProfiler
+from input_source import Input, RecordingInput
 import asyncio
+import time
 
-import webbrowser
 
+class EventBus:
+    """
+    Pumps the event queue once per frame, and hands each event to the handlers subscribed to
+    its type on the next simulation step. Events nothing has subscribed to are dropped as they're
+    pumped, so nothing pays for them after that.
+    """
 
-class Game:
     def __init__(self):
-        pygame.init()
+        # event type: [(handler, owner)]
+        self.handlers = {}
+        # Events something subscribed to, in order, waiting for the next step
+        self.pending = []
+
+    def subscribe(self, event_type, handler, owner=None):
+        """
+        :param handler: Called with each event of that type, in the order they arrived
+        :param owner: Whatever to unsubscribe the handler along with, in unsubscribe_all
+        """
+        self.handlers.setdefault(event_type, []).append((handler, owner))
+
+    def unsubscribe_all(self, owner):
+        for event_type in list(self.handlers):
+            self.handlers[event_type] = [pair for pair in self.handlers[event_type] if pair[1] is not owner]
+            if not self.handlers[event_type]:
+                del self.handlers[event_type]
+
+    def pump(self):
+        """
+        Takes this frame's events from Input, and queues the ones something subscribed to for
+        dispatch. Call once per frame.
+        :return: Every event, in order
+        """
+        events = Input.events()
+        handlers = self.handlers
+        self.pending += [event for event in events if event.type in handlers]
+        return events
+
+    def dispatch(self):
+        """
+        Hands the queued events to their handlers, in the order the events arrived. Call once
+        per simulation step.
+        """
+        pending, self.pending = self.pending, []
+        for event in pending:
+            # Handlers can unsubscribe as they go, so work from a copy
+            for handler, owner in tuple(self.handlers.get(event.type, ())):
+                handler(event)
+
+
+class Game:
+    def __init__(self, input_source=None, profiler=None):
+        """
+        :param input_source: Where input comes from, like a ReplayInput. Defaults to the player,
+            recorded to c.INPUT_RECORDING if that's set.
+        :param profiler: A FrameProfiler to time frames with, instead of the one c.FRAME_PROFILER makes
+        """
+        StartupTimer.mark("imports")
+        if c.LAZY_INIT:
+            # The game only uses the display and the mixer, so leave pygame's other subsystems off
+            pygame.display.init()
+        else:
+            pygame.init()
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
         SoundManager.init()
         ImageManager.init()
-        self.small_screen = pygame.Surface(c.WINDOW_SIZE)
-        self.screen = pygame.display.set_mode(c.SCALED_WINDOW_SIZE)
+        self.presenter = Presenter(c.PRESENT_MODE)
+        self.small_screen = self.presenter.small_screen
+        self.screen = self.presenter.screen
         self.clock = pygame.time.Clock()
-        pygame.mixer.init()
+        self.profiler = profiler
+        if self.profiler is None and c.FRAME_PROFILER:
+            self.profiler = FrameProfiler(log_path=c.FRAME_PROFILE_LOG)
+        self.presenter.profiler = self.profiler
+        if input_source is None and c.INPUT_RECORDING:
+            input_source = RecordingInput(c.INPUT_RECORDING)
+        Input.init(input_source, self.presenter.pointer_scale)
+        self.event_bus = EventBus()
+        self.event_bus.subscribe(pygame.QUIT, self.quit, owner=self)
+        if self.profiler:
+            self.event_bus.subscribe(pygame.KEYDOWN, self.toggle_profiler, owner=self)
+        StartupTimer.mark("sdl init")
 
-        pygame.mixer.music.load("assets/sounds/music.wav")
-        pygame.mixer.music.set_volume(0.3)
-        pygame.mixer.music.play(-1)
+        AssetArchive.init(c.ASSET_ARCHIVE)
+        AssetLoader.init(c.ASSET_MANIFEST)
+        StartupTimer.mark("asset index")
 
+        self.first_frame_shown = False
+        # Seconds since the last input, shake or animation, for c.ADAPTIVE_FRAMERATE
+        self.idle_time = 0
+        self.since_render = 0
         self.shake_amp = 0
         self.since_shake = 999
+        self.shake_offset = Vector()
+        self.full_redraw_pending = True
         self.reset()
         self.current_level = 0
 
@@ -37,6 +123,14 @@ class Game:
 
         asyncio.run(self.main())
 
+    def quit(self, event):
+        pygame.quit()
+        sys.exit()
+
+    def toggle_profiler(self, event):
+        if event.key == FrameProfiler.TOGGLE_KEY:
+            self.profiler.toggle()
+
     def shake(self, amt=15):
         self.shake_amp = amt
         self.since_shake = 0
@@ -45,61 +139,149 @@ class Game:
     def is_web_build():
         return sys.platform == "emscripten"
 
+    def start_deferred(self):
+        """
+        Starts everything the first frame doesn't need. With c.LAZY_INIT this waits until
+        the first frame is on screen.
+        """
+        AssetLoader.start()
+        SoundManager.load_music("assets/sounds/music.wav")
+        pygame.mixer.music.set_volume(0.3)
+        pygame.mixer.music.play(-1)
+
     def open_steam_page(self):
+        import webbrowser
         if not self.is_web_build():
             webbrowser.open('https://store.steampowered.com/app/3284290/Moonsigil_Atlas/')
         else:
             webbrowser.open('https://store.steampowered.com/app/3284290/Moonsigil_Atlas/')
 
     def get_shake_offset(self):
-        magnitude = math.cos(self.since_shake * 50) * self.shake_amp
-        direction = Pose((1, 1))
+        magnitude = math.cos((self.since_shake + GameClock.lag()) * 50) * self.shake_amp
         if abs(magnitude) < 0.25:
             magnitude = 0
-        return direction * magnitude
+        # Along (1, 1), reusing the same Vector every frame
+        self.shake_offset.set_xy(magnitude, magnitude)
+        return self.shake_offset
 
     def reset(self):
         pass
 
+    def update_idle_time(self, dt, events, current_frame):
+        if events or self.shake_amp > 0 or current_frame.is_animating():
+            self.idle_time = 0
+        else:
+            self.idle_time += dt
+
+    def is_idle(self):
+        return c.ADAPTIVE_FRAMERATE and self.idle_time >= c.IDLE_DELAY
+
+    async def idle_wait(self):
+        """
+        Sleeps until the next idle frame is due, or until input arrives.
+        Sleeping through asyncio lets the browser have the time back on the web build.
+        """
+        wake_time = time.perf_counter() + 1 / c.IDLE_FRAMERATE
+        while not Input.input_pending():
+            remaining = wake_time - time.perf_counter()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(min(remaining, c.IDLE_POLL_INTERVAL))
+
     async def main(self):
+        if not c.LAZY_INIT:
+            self.start_deferred()
         current_frame = f.MainFrame(self)
         current_frame.load()
-        self.clock.tick(60)
+        current_frame.subscribe(self.event_bus)
+        StartupTimer.mark("first MainFrame.load")
+        self.clock.tick()
+        GameClock.reset()
 
-        while True:
+        profiler = self.profiler
+        while not Input.finished():
+            if profiler:
+                profiler.begin_frame()
             dt, events = self.get_events()
-            if dt == 0:
-                dt = 1/100000
-            if dt > 0.05:
-                dt = 0.05
-            current_frame.update(dt, events)
-            current_frame.draw(self.small_screen, self.get_shake_offset().get_position())
-            scaled = pygame.transform.scale(self.small_screen, c.SCALED_WINDOW_SIZE)
-            self.screen.blit(scaled, (0, 0))
-            pygame.display.flip()
-            await asyncio.sleep(0)
+            for _ in range(GameClock.advance(dt)):
+                self.step(current_frame, GameClock.STEP)
+            if profiler:
+                profiler.mark("update")
+
+            self.since_render += dt
+            if self.render_due():
+                self.since_render = 0
+                self.render(current_frame)
+            if profiler:
+                profiler.end_frame()
+            if not self.first_frame_shown:
+                self.first_frame_shown = True
+                StartupTimer.mark("first frame")
+                StartupTimer.finish()
+                if c.PROFILE_STARTUP:
+                    print(StartupTimer.report())
+                if c.LAZY_INIT:
+                    self.start_deferred()
+            self.update_idle_time(dt, events, current_frame)
+            if self.is_idle():
+                await self.idle_wait()
+            else:
+                await asyncio.sleep(0)
 
             if current_frame.done:
+                self.event_bus.unsubscribe_all(current_frame)
                 current_frame = current_frame.next_frame()
                 current_frame.load()
+                current_frame.subscribe(self.event_bus)
+                self.full_redraw_pending = True
 
-
-    def get_events(self):
-
-        dt = self.clock.tick(c.FRAMERATE)/1000
-
-        events = pygame.event.get()
-        for event in events:
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-
+    def step(self, current_frame, dt):
+        """
+        Simulates one fixed step. Events that came in since the last step are handled before the update.
+        """
+        self.event_bus.dispatch()
+        current_frame.update(dt)
         self.since_shake += dt
         self.shake_amp -= 5*dt
         self.shake_amp *= 0.001 ** dt
         if (self.shake_amp < 0):
             self.shake_amp = 0
 
+    def render_due(self):
+        """
+        :return: Whether to draw this frame, which is every frame unless c.RENDER_FRAMERATE throttles it
+        """
+        if not self.first_frame_shown or c.RENDER_FRAMERATE is None:
+            return True
+        return self.since_render >= 1 / c.RENDER_FRAMERATE
+
+    def render(self, current_frame):
+        profiler = self.profiler
+        offset = self.get_shake_offset().get_position()
+        current_frame.draw(self.small_screen, offset)
+        hud_visible = profiler and profiler.visible
+        if hud_visible:
+            profiler.draw(self.small_screen)
+        if profiler:
+            profiler.mark("draw")
+        if c.DIRTY_RECTS and not self.full_redraw_pending and offset == (0, 0) and not hud_visible:
+            self.presenter.present(current_frame.dirty_rects())
+        else:
+            self.presenter.present()
+        # Whatever the shake or the HUD covered last frame needs putting back too
+        self.full_redraw_pending = offset != (0, 0) or hud_visible
+
+    def get_events(self):
+
+        # Nothing to pace against until the first frame is up, so don't hold it back
+        dt = Input.tick(self.clock, c.FRAMERATE if self.first_frame_shown else 0)
+        if self.profiler:
+            self.profiler.mark("wait")
+
+        events = self.event_bus.pump()
+        if self.profiler:
+            self.profiler.mark("events")
+
         return dt, events
 
 
@@ -0,0 +1,37 @@
+import constants as c
+from primitives import Vector
+
+
+OFFSET_CACHE = {}
+
+
+def candidate_offsets(length):
+    """
+    Every distinct end point offset a cursor can produce for a line of this length.
+    Directions are walked around a ring of quarter-pixel cursor deltas, which is the
+    resolution of the scaled mouse position, and scaled exactly the way MainFrame does it.
+    :param length: The line length
+    :return: A list of integer (dx, dy) offsets
+    """
+    if length in OFFSET_CACHE:
+        return OFFSET_CACHE[length]
+    radius = max(4, int(length * c.WINDOW_SCALE))
+    ring = []
+    for i in range(-radius, radius):
+        ring += [(i, -radius), (radius, i), (-i, radius), (-radius, -i)]
+    offsets = []
+    seen = set()
+    line = Vector()
+    for a, b in ring:
+        dx = a / c.WINDOW_SCALE
+        dy = b / c.WINDOW_SCALE
+        if dx == 0:
+            dx = 1  # matches MainFrame.compute_placement
+        line.set_xy(dx, dy)
+        line.scale_to(length)
+        offset = int(line.x), int(line.y)
+        if offset not in seen:
+            seen.add(offset)
+            offsets.append(offset)
+    OFFSET_CACHE[length] = offsets
+    return offsets
@@ -0,0 +1,118 @@
+import pygame
+
+import constants as c
+
+
+class Presenter:
+    """
+    Owns the window and the small screen the game draws to, and gets the small screen
+    onto the window each frame.
+    """
+
+    # Scale into a new surface every frame, then blit it to the window
+    TRANSFORM = "transform"
+    # Scale straight into the window surface, so nothing is allocated per frame
+    PREALLOCATED = "preallocated"
+    # Make the window surface the small screen, and let SDL scale it when it's shown
+    SDL_SCALED = "sdl_scaled"
+
+    MODES = TRANSFORM, PREALLOCATED, SDL_SCALED
+
+    def __init__(self, mode=c.PRESENT_MODE):
+        if mode not in Presenter.MODES:
+            raise ValueError(f"Unknown present mode {mode!r}, expected one of {Presenter.MODES}")
+        self.mode = mode
+        # FrameProfiler to report scale, blit and flip times to, if profiling
+        self.profiler = None
+        self.scale = int(c.WINDOW_SCALE)
+        # Dirty rects only line up with window pixels when every small pixel is a whole block of them
+        self.integer_scale = self.scale == c.WINDOW_SCALE \
+            and c.SCALED_WINDOW_SIZE == (c.WINDOW_WIDTH * self.scale, c.WINDOW_HEIGHT * self.scale)
+
+        if mode == Presenter.SDL_SCALED:
+            self.screen = pygame.display.set_mode(c.WINDOW_SIZE, pygame.SCALED)
+            self.small_screen = self.screen
+            # SDL picks the window size itself, and reports the mouse in small screen pixels
+            # whatever it is, so Input scales it up to the c.SCALED_WINDOW_SIZE pixels the game expects
+            self.pointer_scale = c.WINDOW_SCALE
+        else:
+            self.screen = pygame.display.set_mode(c.SCALED_WINDOW_SIZE)
+            self.small_screen = pygame.Surface(c.WINDOW_SIZE)
+            self.pointer_scale = 1
+
+        self.wide = None
+        self.row_blits = None
+        if mode == Presenter.PREALLOCATED and self.integer_scale:
+            # With a whole number scale, each small row is stretched across once, into wide, and
+            # then copied to the window rows it covers. That's the same pixels as a full scale,
+            # but a quarter of the scaling work at 4x.
+            self.wide = pygame.Surface((c.SCALED_WINDOW_WIDTH, c.WINDOW_HEIGHT)).convert(self.screen)
+            self.row_blits = [(self.wide, (0, y * self.scale + row), pygame.Rect(0, y, c.SCALED_WINDOW_WIDTH, 1))
+                              for y in range(c.WINDOW_HEIGHT) for row in range(self.scale)]
+
+    def present(self, dirty_rects=None):
+        """
+        Shows the small screen in the window.
+        :param dirty_rects: Small screen rects that changed, or None to show everything
+        """
+        if dirty_rects is not None and not self.integer_scale and self.mode != Presenter.SDL_SCALED:
+            dirty_rects = None
+
+        profiler = self.profiler
+        if self.mode == Presenter.SDL_SCALED:
+            # SDL scales as part of the flip
+            if dirty_rects is None:
+                pygame.display.flip()
+            elif dirty_rects:
+                pygame.display.update(dirty_rects)
+            if profiler:
+                profiler.mark("flip")
+            return
+
+        if dirty_rects is None:
+            if self.mode == Presenter.TRANSFORM:
+                scaled = pygame.transform.scale(self.small_screen, c.SCALED_WINDOW_SIZE)
+                if profiler:
+                    profiler.mark("scale")
+                self.screen.blit(scaled, (0, 0))
+                if profiler:
+                    profiler.mark("blit")
+            elif self.row_blits is not None:
+                pygame.transform.scale(self.small_screen, self.wide.get_size(), self.wide)
+                self.screen.blits(self.row_blits, doreturn=False)
+                if profiler:
+                    profiler.mark("scale")
+            else:
+                pygame.transform.scale(self.small_screen, c.SCALED_WINDOW_SIZE, self.screen)
+                if profiler:
+                    profiler.mark("scale")
+            pygame.display.flip()
+            if profiler:
+                profiler.mark("flip")
+            return
+
+        scale = self.scale
+        bounds = self.small_screen.get_rect()
+        updated = []
+        for rect in dirty_rects:
+            rect = rect.clip(bounds)
+            if not rect.width or not rect.height:
+                continue
+            scaled_rect = pygame.Rect(rect.x * scale, rect.y * scale, rect.width * scale, rect.height * scale)
+            if self.mode == Presenter.TRANSFORM:
+                scaled = pygame.transform.scale(self.small_screen.subsurface(rect), scaled_rect.size)
+                if profiler:
+                    profiler.mark("scale")
+                self.screen.blit(scaled, scaled_rect)
+                if profiler:
+                    profiler.mark("blit")
+            else:
+                pygame.transform.scale(self.small_screen.subsurface(rect), scaled_rect.size,
+                                       self.screen.subsurface(scaled_rect))
+                if profiler:
+                    profiler.mark("scale")
+            updated.append(scaled_rect)
+        if updated:
+            pygame.display.update(updated)
+        if profiler:
+            profiler.mark("flip")
@@ -141,13 +141,370 @@ class Pose:
         return self.x * other.x + self.y * other.y
 
 
+class Vector:
+    """
+    Pose without the allocations, for anything that moves every frame.
+    Has the same methods and results as Pose, but uses __slots__, adds in place with +=, -= and *=,
+    and caches the sin and cos of its angle until the angle changes.
+    """
+
+    __slots__ = "x", "y", "_angle", "_cos", "_sin"
+
+    def __init__(self, position=(0, 0), angle=0):
+        """ Initialize the Vector.
+            position: two-length tuple (x, y)
+            angle: angle, in degrees counterclockwise from right ->
+        """
+        self.x, self.y = position
+        self._angle = angle
+        self._cos = None
+        self._sin = None
+
+    @property
+    def angle(self):
+        return self._angle
+
+    @angle.setter
+    def angle(self, angle):
+        if angle != self._angle:
+            self._angle = angle
+            self._cos = None
+
+    def trig(self):
+        """ Cosine and sine of the angle, only recalculated when it changes """
+        if self._cos is None:
+            radians = self._angle*math.pi/180
+            self._cos = math.cos(radians)
+            self._sin = math.sin(radians)
+        return self._cos, self._sin
+
+    def set_x(self, new_x):
+        self.x = new_x
+
+    def set_y(self, new_y):
+        self.y = new_y
+
+    def set_position(self, position):
+        self.x, self.y = position
+
+    def set_xy(self, x, y):
+        """ set_position without building a tuple """
+        self.x = x
+        self.y = y
+
+    def set_angle(self, angle):
+        self.angle = angle
+
+    def get_position(self):
+        return self.x, self.y
+
+    def get_angle_of_position(self):
+        return math.atan2(-self.y, self.x)
+
+    def get_angle_radians(self):
+        return self._angle*math.pi/180
+
+    def get_unit_vector(self):
+        """ Return the unit vector equivalent of the Vector's angle """
+        # Negative y points up on displays, as with Pose
+        cos, sin = self.trig()
+        return Vector((cos, -sin))
+
+    def get_weighted_position(self, weight):
+        return self.x*weight, self.y*weight
+
+    def add_position(self, position):
+        add_x, add_y = position
+        self.x += add_x
+        self.y += add_y
+
+    def add_angle(self, angle):
+        self.angle = self._angle + angle
+
+    def rotate_position(self, angle):
+        radians = angle*math.pi/180
+        self.rotate_by(math.cos(radians), math.sin(radians))
+
+    def rotate_by(self, cos, sin):
+        """ rotate_position, with the angle's cosine and sine already worked out """
+        x = self.x*cos + self.y*sin
+        y = -self.x*sin + self.y*cos
+        self.x = x
+        self.y = y
+
+    def add_pose(self, other, weight=1, frame=None):
+        other_x, other_y = other.x, other.y
+        if frame:
+            if isinstance(frame, Vector):
+                cos, sin = frame.trig()
+            else:
+                radians = frame.angle*math.pi/180
+                cos, sin = math.cos(radians), math.sin(radians)
+            other_x, other_y = other_x*cos + other_y*sin, -other_x*sin + other_y*cos
+        self.x += other_x*weight
+        self.y += other_y*weight
+        if other.angle:
+            self.angle = self._angle + other.angle*weight
+
+    def distance_to(self, other):
+        dx = self.x - other.x
+        dy = self.y - other.y
+        return math.sqrt(dx*dx + dy*dy)
+
+    def magnitude(self):
+        return math.sqrt(self.x*self.x + self.y*self.y)
+
+    def clear(self):
+        self.x = 0
+        self.y = 0
+        self.angle = 0
+
+    def copy(self):
+        copy = Vector((self.x, self.y), self._angle)
+        copy._cos, copy._sin = self._cos, self._sin
+        return copy
+
+    def scale_to(self, magnitude):
+        """ Scale the X and Y components of the Vector to have a particular
+            magnitude. Angle is unchanged.
+        """
+        my_magnitude = self.magnitude()
+        if my_magnitude == 0:
+            self.x = magnitude
+            self.y = 0
+            return
+        self.x *= magnitude / my_magnitude
+        self.y *= magnitude / my_magnitude
+
+    def __add__(self, other):
+        copy = self.copy()
+        copy.add_pose(other)
+        return copy
+
+    def __iadd__(self, other):
+        self.add_pose(other)
+        return self
+
+    def __sub__(self, other):
+        return Vector((self.x - other.x, self.y - other.y), self._angle - other.angle)
+
+    def __isub__(self, other):
+        self.x -= other.x
+        self.y -= other.y
+        self.angle = self._angle - other.angle
+        return self
+
+    def __mul__(self, other):
+        return Vector((self.x*other, self.y*other), self._angle*other)
+
+    def __imul__(self, other):
+        self.x *= other
+        self.y *= other
+        self.angle = self._angle*other
+        return self
+
+    def __pow__(self, other):
+        x = self.x ** other if self.x >= 0 else (abs(self.x) ** other) * -1
+        y = self.y ** other if self.y >= 0 else (abs(self.y) ** other) * -1
+        return Vector((x, y), self._angle)
+
+    def __str__(self):
+        return f"<Vector x:{self.x} y:{self.y} angle:{self._angle}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def dot(self, other):
+        return self.x * other.x + self.y * other.y
+
+
 class PhysicsObject(GameObject):
-    def __init__(self, game, position, angle):
+    def __init__(self, game, position, angle, system=None):
+        """
+        :param system: PhysicsSystem to integrate this with every other body in it, instead of on its own
+        """
         super().__init__(game)
-        self.pose = Pose(position, angle)
-        self.velocity = Pose(position=(0, 0), angle=0)
-        self.acceleration = Pose(position=(0, 0), angle=0)
+        self.pose = Vector(position, angle)
+        self.velocity = Vector(position=(0, 0), angle=0)
+        self.acceleration = Vector(position=(0, 0), angle=0)
+        self.system = None
+        if system is not None:
+            system.add(self)
 
     def update(self, dt, events):
+        if self.system is not None:
+            # Moved by system.step along with everything else in it
+            return
         self.velocity.add_pose(self.acceleration, weight=dt)
-        self.pose.add_pose(self.velocity, weight=dt)
\ No newline at end of file
+        self.pose.add_pose(self.velocity, weight=dt)
+
+
+class BodyVector:
+    """
+    One PhysicsObject's pose, velocity or acceleration, living in a PhysicsSystem's arrays.
+    Reads and writes go straight to the arrays. Anything else Vector can do works on a copy,
+    which is written back for the methods that change it.
+    """
+
+    __slots__ = "xs", "ys", "angles", "index"
+
+    def __init__(self, xs, ys, angles, index):
+        self.xs = xs
+        self.ys = ys
+        self.angles = angles
+        self.index = index
+
+    @property
+    def x(self):
+        return self.xs[self.index]
+
+    @x.setter
+    def x(self, x):
+        self.xs[self.index] = x
+
+    @property
+    def y(self):
+        return self.ys[self.index]
+
+    @y.setter
+    def y(self, y):
+        self.ys[self.index] = y
+
+    @property
+    def angle(self):
+        return self.angles[self.index]
+
+    @angle.setter
+    def angle(self, angle):
+        self.angles[self.index] = angle
+
+    def get_position(self):
+        return self.xs[self.index], self.ys[self.index]
+
+    def set_position(self, position):
+        self.xs[self.index], self.ys[self.index] = position
+
+    def copy(self):
+        return Vector(self.get_position(), self.angle)
+
+    def store(self, vector):
+        self.xs[self.index] = vector.x
+        self.ys[self.index] = vector.y
+        self.angles[self.index] = vector.angle
+
+    # In place operators write through to the arrays, rather than falling back to the copying
+    # ones, which would leave the body holding a Vector the system no longer sees
+    def __iadd__(self, other):
+        index = self.index
+        self.xs[index] += other.x
+        self.ys[index] += other.y
+        self.angles[index] += other.angle
+        return self
+
+    def __isub__(self, other):
+        index = self.index
+        self.xs[index] -= other.x
+        self.ys[index] -= other.y
+        self.angles[index] -= other.angle
+        return self
+
+    def __imul__(self, other):
+        index = self.index
+        self.xs[index] *= other
+        self.ys[index] *= other
+        self.angles[index] *= other
+        return self
+
+    def __str__(self):
+        return f"<BodyVector x:{self.x} y:{self.y} angle:{self.angle}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def _body_vector_method(name, changes):
+    def method(self, *args, **kwargs):
+        vector = self.copy()
+        result = getattr(vector, name)(*args, **kwargs)
+        if changes:
+            self.store(vector)
+        return result
+    method.__name__ = name
+    return method
+
+
+for _name in ("set_x", "set_y", "set_xy", "set_angle", "add_position", "add_angle", "rotate_position",
+              "rotate_by", "add_pose", "clear", "scale_to"):
+    setattr(BodyVector, _name, _body_vector_method(_name, changes=True))
+for _name in ("get_angle_of_position", "get_angle_radians", "get_unit_vector", "get_weighted_position",
+              "distance_to", "magnitude", "dot", "__add__", "__sub__", "__mul__", "__pow__"):
+    setattr(BodyVector, _name, _body_vector_method(_name, changes=False))
+
+
+class PhysicsSystem:
+    """
+    Keeps every registered PhysicsObject's pose, velocity and acceleration in flat arrays,
+    one per component, and integrates all of them at once in step.
+    Objects see their state through BodyVectors, so code written for PhysicsObject still works.
+    """
+
+    COMPONENTS = "x", "y", "angle", "vx", "vy", "vangle", "ax", "ay", "aangle"
+
+    def __init__(self):
+        for component in PhysicsSystem.COMPONENTS:
+            setattr(self, component, [])
+        self.bodies = []
+
+    def __len__(self):
+        return len(self.bodies)
+
+    def add(self, body):
+        """
+        Moves body's state into the arrays. It's integrated by step from now on.
+        """
+        index = len(self.bodies)
+        values = body.pose.get_position() + (body.pose.angle,) \
+            + body.velocity.get_position() + (body.velocity.angle,) \
+            + body.acceleration.get_position() + (body.acceleration.angle,)
+        for component, value in zip(PhysicsSystem.COMPONENTS, values):
+            getattr(self, component).append(value)
+        body.pose = BodyVector(self.x, self.y, self.angle, index)
+        body.velocity = BodyVector(self.vx, self.vy, self.vangle, index)
+        body.acceleration = BodyVector(self.ax, self.ay, self.aangle, index)
+        body.system = self
+        self.bodies.append(body)
+
+    def remove(self, body):
+        """
+        Gives body its state back as plain Vectors, and fills its slot with the last body.
+        """
+        index = body.pose.index
+        body.pose = body.pose.copy()
+        body.velocity = body.velocity.copy()
+        body.acceleration = body.acceleration.copy()
+        body.system = None
+
+        last = self.bodies.pop()
+        for component in PhysicsSystem.COMPONENTS:
+            array = getattr(self, component)
+            value = array.pop()
+            if last is not body:
+                array[index] = value
+        if last is not body:
+            self.bodies[index] = last
+            last.pose.index = last.velocity.index = last.acceleration.index = index
+
+    def step(self, dt):
+        """
+        Integrates every body the same way PhysicsObject.update does on its own.
+        Arrays are updated in place, since every BodyVector holds on to them.
+        """
+        self.vx[:] = [v + a*dt for v, a in zip(self.vx, self.ax)]
+        self.vy[:] = [v + a*dt for v, a in zip(self.vy, self.ay)]
+        self.x[:] = [p + v*dt for p, v in zip(self.x, self.vx)]
+        self.y[:] = [p + v*dt for p, v in zip(self.y, self.vy)]
+        # Most bodies don't spin, so angles are only integrated when something is turning
+        if any(self.aangle):
+            self.vangle[:] = [v + a*dt for v, a in zip(self.vangle, self.aangle)]
+        if any(self.vangle):
+            self.angle[:] = [p + v*dt for p, v in zip(self.angle, self.vangle)]
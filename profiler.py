@@ -0,0 +1,125 @@
+import atexit
+import json
+import time
+from collections import deque
+
+import pygame
+
+
+class FrameProfiler:
+    """
+    Times each phase of a frame and keeps rolling percentiles of them.
+    Game only makes one when c.FRAME_PROFILER is on, and checks for None everywhere else,
+    so a disabled profiler costs nothing but those checks.
+    """
+
+    PHASES = "wait", "events", "update", "draw", "scale", "blit", "flip"
+    # Everything except waiting for the next frame
+    TOTAL = "frame"
+    PERCENTILES = 50, 95, 99
+    # Frames between recalculating the percentiles shown on the HUD
+    STATS_INTERVAL = 30
+    TOGGLE_KEY = pygame.K_F3
+
+    def __init__(self, window=240, log_path=None):
+        """
+        :param window: How many recent frames the percentiles are taken over, or None for all of them
+        :param log_path: File to stream every frame's timings to, as .csv or .jsonl
+        """
+        self.history = {phase: deque(maxlen=window) for phase in FrameProfiler.PHASES + (FrameProfiler.TOTAL,)}
+        self.times = dict.fromkeys(FrameProfiler.PHASES, 0)
+        self.last_mark = time.perf_counter()
+        self.frame_count = 0
+        self.stats = {}
+        self.visible = False
+        self.font = None
+
+        self.log = None
+        self.log_as_csv = False
+        if log_path is not None:
+            self.log = open(log_path, "w")
+            atexit.register(self.log.close)
+            self.log_as_csv = log_path.endswith(".csv")
+            if self.log_as_csv:
+                self.log.write(",".join(("frame",) + FrameProfiler.PHASES) + "\n")
+
+    def begin_frame(self):
+        self.times = dict.fromkeys(FrameProfiler.PHASES, 0)
+        self.last_mark = time.perf_counter()
+
+    def mark(self, phase):
+        """
+        Ends a phase, counting everything since the last mark towards it.
+        """
+        now = time.perf_counter()
+        self.times[phase] += now - self.last_mark
+        self.last_mark = now
+
+    def end_frame(self):
+        times = self.times
+        for phase in FrameProfiler.PHASES:
+            self.history[phase].append(times[phase])
+        self.history[FrameProfiler.TOTAL].append(sum(times.values()) - times["wait"])
+        self.frame_count += 1
+        if self.frame_count % FrameProfiler.STATS_INTERVAL == 0:
+            self.stats = self.percentiles()
+
+        if self.log is None:
+            return
+        if self.log_as_csv:
+            self.log.write(",".join([str(self.frame_count)] + [f"{times[phase] * 1000:.3f}" for phase in FrameProfiler.PHASES]) + "\n")
+        else:
+            row = {phase: round(times[phase] * 1000, 3) for phase in FrameProfiler.PHASES}
+            row["frame"] = self.frame_count
+            self.log.write(json.dumps(row) + "\n")
+
+    def percentiles(self):
+        """
+        :return: {phase: (p50, p95, p99)} over the window, in milliseconds
+        """
+        stats = {}
+        for phase, samples in self.history.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            last = len(ordered) - 1
+            stats[phase] = tuple(ordered[round(last * p / 100)] * 1000 for p in FrameProfiler.PERCENTILES)
+        return stats
+
+    def report(self, worst=5):
+        """
+        :param worst: How many of the slowest frames to list
+        :return: The percentiles of each phase and the slowest frames, as text
+        """
+        lines = [f"{'phase':<8}" + "".join(f"{'p' + str(p):>8}" for p in FrameProfiler.PERCENTILES)]
+        for phase, values in self.percentiles().items():
+            lines.append(f"{phase:<8}" + "".join(f"{value:8.3f}" for value in values))
+        totals = self.history[FrameProfiler.TOTAL]
+        first_frame = self.frame_count - len(totals) + 1
+        slowest = sorted(range(len(totals)), key=lambda index: totals[index], reverse=True)[:worst]
+        lines.append("slowest frames: " + ", ".join(f"{first_frame + index} ({totals[index] * 1000:.2f} ms)" for index in slowest))
+        return "\n".join(lines)
+
+    def toggle(self):
+        self.visible = not self.visible
+
+    def draw(self, surface):
+        """
+        Draws the latest percentiles in the corner, if the HUD is showing.
+        """
+        if not self.visible:
+            return
+        if self.font is None:
+            # The font module is left off at startup unless something needs it
+            pygame.font.init()
+            self.font = pygame.font.Font(None, 12)
+
+        lines = ["phase    p50   p95   p99"]
+        for phase in FrameProfiler.PHASES + (FrameProfiler.TOTAL,):
+            if phase in self.stats:
+                lines.append(f"{phase:<7}" + "".join(f"{value:6.2f}" for value in self.stats[phase]))
+        line_height = self.font.get_linesize()
+        backdrop = pygame.Rect(0, 0, 110, line_height * len(lines) + 2)
+        surface.fill((0, 0, 0), backdrop)
+        for index, line in enumerate(lines):
+            surface.blit(self.font.render(line, False, (255, 255, 255)), (2, 1 + index * line_height))
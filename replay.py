@@ -0,0 +1,36 @@
+"""
+Plays back a recording made with c.INPUT_RECORDING, headlessly and as fast as possible,
+then reports how long each phase of each frame took.
+
+    python replay.py recording [--dt seconds] [--log frames.csv]
+"""
+import argparse
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from input_source import ReplayInput
+from main import Game
+from profiler import FrameProfiler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="file written by RecordingInput")
+    parser.add_argument("--dt", type=float, default=None, help="seconds per frame, instead of the recorded frame times")
+    parser.add_argument("--log", default=None, help="also write every frame's timings to this .csv or .jsonl file")
+    args = parser.parse_args()
+
+    profiler = FrameProfiler(window=None, log_path=args.log)
+    try:
+        Game(ReplayInput(args.recording, args.dt), profiler)
+    except SystemExit:
+        # The recording ended with the window being closed
+        pass
+    print(f"{profiler.frame_count} frames")
+    print(profiler.report())
+
+
+if __name__ == '__main__':
+    main()
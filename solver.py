@@ -0,0 +1,328 @@
+import heapq
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import constants as c
+from placement_offsets import candidate_offsets
+
+
+# Octile distance over-estimates a straight line by at most this factor, at 22.5 degrees
+OCTILE_STRETCH = math.sqrt(4 - 2 * math.sqrt(2))
+
+
+def distance_field(wall_mask, sources):
+    """
+    Shortest 8-connected path length from the nearest source to every cell, through cells
+    that aren't walls. A clear segment is itself such a path, so this can never exceed the
+    length of the lines needed times OCTILE_STRETCH.
+    :param wall_mask: The WallMask of the level
+    :param sources: Cells the distances are measured from
+    :return: Flat list indexed by y * width + x, math.inf where unreachable
+    """
+    width, height = wall_mask.width, wall_mask.height
+    distances = [math.inf] * (width * height)
+    queue = []
+    for x, y in sources:
+        distances[y * width + x] = 0
+        queue.append((0, x, y))
+    heapq.heapify(queue)
+    diagonal = math.sqrt(2)
+    steps = [(1, 0, 1), (-1, 0, 1), (0, 1, 1), (0, -1, 1),
+             (1, 1, diagonal), (1, -1, diagonal), (-1, 1, diagonal), (-1, -1, diagonal)]
+    while queue:
+        distance, x, y = heapq.heappop(queue)
+        if distance > distances[y * width + x]:
+            continue
+        for dx, dy, cost in steps:
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < width and 0 <= ny < height) or wall_mask.is_wall(nx, ny):
+                continue
+            index = ny * width + nx
+            if distance + cost < distances[index]:
+                distances[index] = distance + cost
+                heapq.heappush(queue, (distance + cost, nx, ny))
+    return distances
+
+
+def cells_within(center, radius, width, height):
+    return [(x, y)
+            for y in range(max(0, center[1] - radius), min(height, center[1] + radius + 1))
+            for x in range(max(0, center[0] - radius), min(width, center[0] + radius + 1))
+            if (x - center[0])**2 + (y - center[1])**2 < radius**2]
+
+
+class Puzzle:
+    """
+    The parts of a Level the rules depend on, without any surfaces, so it can be sent to
+    worker processes.
+    """
+
+    def __init__(self, start, destination, pickups, line_lengths, wall_mask,
+                 destination_radius=c.DESTINATION_RADIUS, pickup_radius=c.PICKUP_RADIUS):
+        self.start = tuple(start)
+        self.destination = tuple(destination)
+        self.pickups = tuple(tuple(pickup) for pickup in pickups)
+        self.line_lengths = tuple(line_lengths)
+        self.wall_mask = wall_mask
+        self.destination_radius = destination_radius
+        self.pickup_radius = pickup_radius
+
+    @staticmethod
+    def from_level(level):
+        return Puzzle(level.start_position,
+                      level.destination_position,
+                      level.pickups,
+                      level.line_lengths,
+                      level.wall_mask)
+
+
+class SolveResult:
+    def __init__(self, moves, nodes, dead_ends, elapsed):
+        """
+        :param moves: The end point of every line in order, or None if the level can't be won
+        :param nodes: Positions searched. This is the closest thing to a difficulty score.
+        :param dead_ends: Positions searched that turned out to be unwinnable
+        :param elapsed: Seconds spent searching
+        """
+        self.moves = moves
+        self.nodes = nodes
+        self.dead_ends = dead_ends
+        self.elapsed = elapsed
+
+    @property
+    def solvable(self):
+        return self.moves is not None
+
+    def __str__(self):
+        verdict = f"solved in {len(self.moves)} moves" if self.solvable else "unsolvable"
+        return f"<SolveResult {verdict}, {self.nodes} nodes, {self.dead_ends} dead ends, {self.elapsed*1000:.0f} ms>"
+
+
+class Solver:
+    """
+    Depth first search over placements, following the same rules as MainFrame:
+    the segment must be clear of walls, pickups are collected within pickup_radius of an
+    end point, and the final line must land within destination_radius of the destination
+    with every pickup already collected.
+    """
+
+    def __init__(self, puzzle):
+        self.puzzle = puzzle
+        mask = puzzle.wall_mask
+        self.width = mask.width
+        self.height = mask.height
+        lengths = puzzle.line_lengths
+        self.offsets = [candidate_offsets(length) for length in lengths]
+        self.budgets = [sum(lengths[depth:]) * OCTILE_STRETCH + 1e-6 for depth in range(len(lengths) + 1)]
+        self.last_length = lengths[-1] * OCTILE_STRETCH if lengths else 0
+        self.closest = []
+        for depth in range(len(lengths) + 1):
+            rest = lengths[depth:]
+            # A chain of lines can't end closer to where it started than this, less a pixel
+            # or so per line lost to truncating the end points
+            self.closest.append(max(0, 2 * max(rest, default=0) - sum(rest)) - 1.5 * len(rest))
+
+        self.to_destination = distance_field(mask, self.free_cells_within(puzzle.destination, puzzle.destination_radius))
+        self.to_pickup = {}
+        self.pickup_to_destination = {}
+        self.pickups_at = {}
+        for pickup in puzzle.pickups:
+            cells = self.free_cells_within(pickup, puzzle.pickup_radius)
+            self.to_pickup[pickup] = distance_field(mask, cells)
+            self.pickup_to_destination[pickup] = min((self.to_destination[y * self.width + x] for x, y in cells),
+                                                     default=math.inf)
+            for cell in cells:
+                self.pickups_at[cell] = self.pickups_at.get(cell, ()) + (pickup,)
+
+        self.reachable = {}
+        self.dead = set()
+        self.nodes = 0
+
+    def free_cells_within(self, center, radius):
+        mask = self.puzzle.wall_mask
+        return [cell for cell in cells_within(center, radius, self.width, self.height) if not mask.is_wall(*cell)]
+
+    def solve(self):
+        then = time.time()
+        moves = self.search(0, self.puzzle.start, self.puzzle.pickups)
+        return SolveResult(moves, self.nodes, len(self.dead), time.time() - then)
+
+    def is_reachable(self, depth, point, remaining):
+        """
+        Distance bounds on whether the rest of the lines could still collect every pickup and
+        finish on the destination. Distances go around walls, but ignore that lines are straight.
+        """
+        budget = self.budgets[depth]
+        index = point[1] * self.width + point[0]
+        to_destination = self.to_destination[index]
+        if to_destination > budget:
+            return False
+        destination = self.puzzle.destination
+        if math.dist(point, destination) + self.puzzle.destination_radius < self.closest[depth]:
+            return False
+        # Pickups only count if they were collected before the final line
+        before_last = budget - self.last_length
+        for pickup in remaining:
+            to_pickup = self.to_pickup[pickup][index]
+            if to_pickup > before_last or to_pickup + self.pickup_to_destination[pickup] > budget:
+                return False
+        return True
+
+    def reachable_cells(self, depth, remaining):
+        """
+        is_reachable for every cell at once, cached per depth and set of remaining pickups
+        :return: A bytearray indexed by y * width + x
+        """
+        key = depth, remaining
+        if key not in self.reachable:
+            self.reachable[key] = bytearray(self.is_reachable(depth, (x, y), remaining)
+                                            for y in range(self.height) for x in range(self.width))
+        return self.reachable[key]
+
+    def expand(self, depth, point, remaining):
+        """
+        Every placement from a point that could still lead to a win, as a batch: end points are
+        generated from the offset table for this line, and bounds and reachability are checked
+        for the whole batch with table lookups. Walls are left to the caller, since most
+        candidates are never tried.
+        :return: A list of (end, remaining pickups after the move), most promising first
+        """
+        puzzle = self.puzzle
+        if not puzzle.line_lengths[depth]:
+            return []
+        x, y = point
+        width, height = self.width, self.height
+        if remaining:
+            index = y * width + x
+            target = self.to_pickup[min(remaining, key=lambda pickup: self.to_pickup[pickup][index])]
+        else:
+            target = self.to_destination
+
+        ends = [(x + dx, y + dy) for dx, dy in self.offsets[depth] if 0 <= x + dx < width and 0 <= y + dy < height]
+        final = depth + 1 == len(puzzle.line_lengths)
+        pickups_at = self.pickups_at
+        reachable = None if final else self.reachable_cells(depth + 1, remaining)
+        batch = [(len(remaining), target[end[1] * width + end[0]], end, remaining) for end in ends
+                 if end not in pickups_at and (final or reachable[end[1] * width + end[0]])]
+        for end in ends:
+            if end in pickups_at:
+                left = tuple(pickup for pickup in remaining if pickup not in pickups_at[end])
+                if final or self.reachable_cells(depth + 1, left)[end[1] * width + end[0]]:
+                    batch.append((len(left), target[end[1] * width + end[0]], end, left))
+        batch.sort()
+        return [(end, left) for count, distance, end, left in batch]
+
+    def is_victory(self, end, remaining):
+        puzzle = self.puzzle
+        if remaining:
+            return False
+        dx = end[0] - puzzle.destination[0]
+        dy = end[1] - puzzle.destination[1]
+        return dx**2 + dy**2 < puzzle.destination_radius**2
+
+    def search(self, depth, point, remaining):
+        """
+        :return: The list of end points placed after this one, or None if there is no way to win
+        """
+        state = depth, point, remaining
+        if state in self.dead:
+            return None
+        self.nodes += 1
+        last = depth == len(self.puzzle.line_lengths) - 1
+        mask = self.puzzle.wall_mask
+        dead = self.dead
+        for end, left in self.expand(depth, point, remaining):
+            if last:
+                # Victory is decided on the pickups held before the final line
+                if self.is_victory(end, remaining) and mask.segment_is_clear(point, end):
+                    return [end]
+                continue
+            if (depth + 1, end, left) in dead or not mask.segment_is_clear(point, end):
+                continue
+            rest = self.search(depth + 1, end, left)
+            if rest is not None:
+                return [end] + rest
+        self.dead.add(state)
+        return None
+
+
+WORKER_SOLVER = None
+
+
+def start_worker(puzzle):
+    # Each worker process builds its distance fields once and keeps its dead ends between tasks
+    global WORKER_SOLVER
+    WORKER_SOLVER = Solver(puzzle)
+
+
+def solve_after_first_move(end, remaining):
+    solver = WORKER_SOLVER
+    then = time.time()
+    nodes = solver.nodes
+    dead_ends = len(solver.dead)
+    rest = solver.search(1, end, remaining)
+    moves = None if rest is None else [end] + rest
+    return SolveResult(moves, solver.nodes - nodes, len(solver.dead) - dead_ends, time.time() - then)
+
+
+def solve(level, workers=1):
+    """
+    Searches for a winning sequence of placements.
+    :param level: A Level from LevelLibrary, or a Puzzle
+    :param workers: Number of processes to split the first move between
+    :return: A SolveResult
+    """
+    puzzle = level if isinstance(level, Puzzle) else Puzzle.from_level(level)
+    solver = Solver(puzzle)
+    if workers <= 1 or len(puzzle.line_lengths) < 2:
+        return solver.solve()
+
+    then = time.time()
+    first_moves = [(end, left) for end, left in solver.expand(0, puzzle.start, puzzle.pickups)
+                   if puzzle.wall_mask.segment_is_clear(puzzle.start, end)]
+    nodes = 1
+    dead_ends = 0
+    moves = None
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=start_worker, initargs=(puzzle,))
+    try:
+        # Submitted most promising first, so the pool works through them roughly in the same
+        # order a single process would
+        futures = [executor.submit(solve_after_first_move, end, left) for end, left in first_moves]
+        for future in as_completed(futures):
+            result = future.result()
+            nodes += result.nodes
+            dead_ends += result.dead_ends
+            if result.solvable:
+                moves = result.moves
+                break
+    finally:
+        executor.shutdown(cancel_futures=True)
+    return SolveResult(moves, nodes, dead_ends, time.time() - then)
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import pygame
+    from image_manager import ImageManager
+    from level_library import LevelLibrary
+
+    parser = argparse.ArgumentParser(description="Checks that every level can be beaten.")
+    parser.add_argument("levels", nargs="*", type=int, help="Level numbers, starting at 1. Defaults to all.")
+    parser.add_argument("--workers", type=int, default=1, help="Processes to split each search between.")
+    args = parser.parse_args()
+
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    ImageManager.init()
+
+    numbers = args.levels or range(1, LevelLibrary.count() + 1)
+    for number in numbers:
+        result = solve(LevelLibrary.get(number - 1), workers=args.workers)
+        print(f"Level {number}: {result}")
+        if result.solvable:
+            print(f"    {result.moves}")
@@ -1,5 +1,11 @@
+import time
+
 import pygame
 
+from asset_archive import AssetArchive
+from asset_loader import AssetLoader
+from startup_timer import StartupTimer
+
 
 class SoundManager:
     """
@@ -8,6 +14,7 @@ class SoundManager:
 
     initialized = False
     sounds = None
+    music = None
 
     @staticmethod
     def init():
@@ -48,6 +55,25 @@ class SoundManager:
         SoundManager.check_initialized()
         if path in SoundManager.sounds:
             return SoundManager.sounds[path]
-        sound = pygame.mixer.Sound(path)
+        started = time.perf_counter()
+        sound = AssetLoader.take(path)
+        if sound is None:
+            sound = AssetArchive.sound(path)
+        if sound is None:
+            sound = pygame.mixer.Sound(path)
+        StartupTimer.add("asset decode", time.perf_counter() - started)
         SoundManager.sounds[path] = sound
-        return sound
\ No newline at end of file
+        return sound
+
+    @staticmethod
+    def load_music(path):
+        """
+        Loads the music to stream, from the asset archive if it's in there.
+        :param path: The path of the music file
+        """
+        SoundManager.music = AssetArchive.file(path)
+        if SoundManager.music is None:
+            pygame.mixer.music.load(path)
+        else:
+            # Kept referenced in SoundManager.music, since the mixer streams from it while playing
+            pygame.mixer.music.load(SoundManager.music, path.rsplit(".", 1)[-1])
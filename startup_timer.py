@@ -0,0 +1,49 @@
+import time
+
+
+class StartupTimer:
+    """
+    Static class that times each phase of startup, up to the first frame on screen.
+    The clock starts when this module is imported, so import it before anything else.
+    """
+
+    started = time.perf_counter()
+    last_mark = started
+    phases = []
+    # Time spent inside phases, like decoding assets, which is spread across several of them
+    totals = {}
+    running = True
+
+    @staticmethod
+    def mark(name):
+        """
+        Ends the current phase.
+        :param name: What happened since the last mark
+        """
+        now = time.perf_counter()
+        StartupTimer.phases.append((name, now - StartupTimer.last_mark))
+        StartupTimer.last_mark = now
+
+    @staticmethod
+    def add(name, seconds):
+        """
+        Counts time towards a total that's reported next to the phases.
+        """
+        if StartupTimer.running:
+            StartupTimer.totals[name] = StartupTimer.totals.get(name, 0) + seconds
+
+    @staticmethod
+    def finish():
+        """
+        Stops timing, once the first frame is on screen.
+        :return: Seconds from import to now
+        """
+        StartupTimer.running = False
+        return StartupTimer.last_mark - StartupTimer.started
+
+    @staticmethod
+    def report():
+        lines = [f"{name:<24}{seconds * 1000:8.1f} ms" for name, seconds in StartupTimer.phases]
+        lines += [f"  {name:<22}{seconds * 1000:8.1f} ms" for name, seconds in StartupTimer.totals.items()]
+        lines.append(f"{'first pixel':<24}{(StartupTimer.last_mark - StartupTimer.started) * 1000:8.1f} ms")
+        return "\n".join(lines)
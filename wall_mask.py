@@ -0,0 +1,95 @@
+import pygame
+
+
+class WallMask:
+    """
+    Bit-packed copy of a level surface's walls, built once per level.
+    Each row (and each column) is a single int with bit x set where the pixel at x is a wall.
+    """
+
+    THRESHOLD = 200
+
+    def __init__(self, width, height, rows, columns):
+        self.width = width
+        self.height = height
+        self.rows = rows
+        self.columns = columns
+
+    @staticmethod
+    def from_surface(surface):
+        width, height = surface.get_size()
+        blue = pygame.image.tobytes(surface, "RGBA")[2::4]
+        # Map each pixel to an ASCII binary digit so whole lines can be parsed by int()
+        table = bytes(ord("1") if value > WallMask.THRESHOLD else ord("0") for value in range(256))
+        digits = blue.translate(table)
+        # Reversed, so the pixel at index 0 becomes the least significant bit
+        rows = [int(digits[y * width:(y + 1) * width][::-1], 2) for y in range(height)]
+        columns = [int(digits[x::width][::-1], 2) for x in range(width)]
+        return WallMask(width, height, rows, columns)
+
+    def pack(self):
+        """
+        :return: The rows and the columns as bytes, for unpack to read back
+        """
+        row_bytes = (self.width + 7) // 8
+        column_bytes = (self.height + 7) // 8
+        return b"".join(row.to_bytes(row_bytes, "little") for row in self.rows), \
+            b"".join(column.to_bytes(column_bytes, "little") for column in self.columns)
+
+    @staticmethod
+    def unpack(width, height, rows, columns):
+        row_bytes = (width + 7) // 8
+        column_bytes = (height + 7) // 8
+        rows = [int.from_bytes(rows[y * row_bytes:(y + 1) * row_bytes], "little") for y in range(height)]
+        columns = [int.from_bytes(columns[x * column_bytes:(x + 1) * column_bytes], "little") for x in range(width)]
+        return WallMask(width, height, rows, columns)
+
+    def is_wall(self, x, y):
+        return bool(self.rows[y] >> x & 1)
+
+    def segment_is_clear(self, start, end):
+        """
+        Checks every pixel the segment passes through, not just a sample of them.
+        :param start: Integer (x, y) in level space
+        :param end: Integer (x, y) in level space
+        :return: False if the segment leaves the level or touches a wall
+        """
+        x0, y0 = int(start[0]), int(start[1])
+        x1, y1 = int(end[0]), int(end[1])
+        if not (0 <= x0 < self.width and 0 <= y0 < self.height
+                and 0 <= x1 < self.width and 0 <= y1 < self.height):
+            return False
+        if abs(y1 - y0) <= abs(x1 - x0):
+            return self._spans_are_clear(self.rows, x0, y0, x1, y1)
+        return self._spans_are_clear(self.columns, y0, x0, y1, x1)
+
+    @staticmethod
+    def _spans_are_clear(lines, u0, v0, u1, v1):
+        """
+        Walks the segment one line of the minor axis v at a time, and tests the whole run
+        of pixels it covers along the major axis u with a single mask.
+        """
+        if v1 < v0:
+            u0, v0, u1, v1 = u1, v1, u0, v0
+        du = u1 - u0
+        dv = v1 - v0
+        if dv == 0:
+            lo, hi = min(u0, u1), max(u0, u1)
+            return not lines[v0] >> lo & ((2 << (hi - lo)) - 1)
+
+        # Numerator of u where the segment enters line v, over a denominator of dv
+        enter = u0 * dv
+        for v in range(v0, v1):
+            leave = enter + du
+            if du > 0:
+                lo = enter // dv
+                hi = -(-leave // dv) - 1
+            elif du < 0:
+                lo = leave // dv
+                hi = enter // dv
+            else:
+                lo = hi = u0
+            if lines[v] >> lo & ((2 << (hi - lo)) - 1):
+                return False
+            enter = leave
+        return not lines[v1] >> u1 & 1